@@ -1,9 +1,14 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, status
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 import motor.motor_asyncio
+import orjson
+from pymongo import ReturnDocument, UpdateMany, UpdateOne, monitoring
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ExecutionTimeout, OperationFailure
 import os
 from dotenv import load_dotenv
 import uuid
@@ -23,11 +28,65 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import io
 import base64
+import copy
+import asyncio
+import bisect
+import hashlib
+import heapq
+import math
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 load_dotenv()
 
 app = FastAPI(title="Advanced Portfolio & Project Management System", version="1.0.0")
 
+# Upload size limit
+# Registered before CORSMiddleware so CORS wraps it and early 413s carry CORS headers
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB default
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024  # Multipart boundaries and part headers
+UPLOAD_PATH = re.compile(r"^/api/projects/[^/]+/upload$")
+
+class UploadSizeLimitMiddleware:
+    """Enforce MAX_FILE_SIZE on upload request bodies before the form is parsed.
+    
+    A declared Content-Length over the limit is refused without reading the
+    body; chunked bodies are counted as they are received.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not UPLOAD_PATH.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        
+        limit = MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD_BYTES
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": "File too large"}, status_code=413)(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="File too large")
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -35,47 +94,283 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # MongoDB connection
+# Client options set here take precedence over the same options in MONGO_URL
 MONGO_URL = os.getenv("MONGO_URL")
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 0))  # 0 waits for a connection indefinitely
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000))
+# Comma separated wire compressors in order of preference, e.g. "zstd,snappy,zlib".
+# zstd and snappy need the pymongo[zstd] / pymongo[snappy] extras; pymongo skips
+# (with a warning) any compressor whose module is missing.
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+# Per-operation read routing. Reads that tolerate replication lag go through
+# read_db(operation), configured by MONGO_<OPERATION>_READ_PREFERENCE; everything
+# else, including CRUD reads-after-write, uses db on the primary. On a standalone
+# server every mode reads from the primary.
+READ_OPERATIONS = ("analytics", "search", "export")
+MONGO_READ_POLICY = {
+    operation: os.getenv(f"MONGO_{operation.upper()}_READ_PREFERENCE", "secondaryPreferred")
+    for operation in READ_OPERATIONS
+}
+# Secondaries lagging the primary by more than this are not read from (-1: no
+# bound). MongoDB requires at least 90 seconds; ignored for primary routing.
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", -1))
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """Measures how long operations wait to check a connection out of the pool.
+    
+    Motor checks connections out synchronously on its worker threads, so the
+    start and end events of one checkout arrive on the same thread.
+    """
+
+    def __init__(self, sample_size: int = 1024):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=sample_size)
+        self.checkouts = 0
+        self.failures = Counter()
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.open_connections = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is None:
+            return
+        self._local.started = None
+        wait_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self._recent.append(wait_ms)
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            self.failures[str(event.reason)] += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_checked_in(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts = self.checkouts
+            return {
+                "max_pool_size": MONGO_MAX_POOL_SIZE,
+                "min_pool_size": MONGO_MIN_POOL_SIZE,
+                "open_connections": self.open_connections,
+                "checkouts": checkouts,
+                "checkout_failures": dict(self.failures),
+                "avg_wait_ms": round(self.total_wait_ms / checkouts, 3) if checkouts else 0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "recent_p50_wait_ms": round(recent[len(recent) // 2], 3) if recent else 0,
+                "recent_p99_wait_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.99))], 3) if recent else 0
+            }
+
+mongo_pool_listener = PoolCheckoutListener()
+mongo_client_options = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+    "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "event_listeners": [mongo_pool_listener]
+}
+if MONGO_COMPRESSORS:
+    mongo_client_options["compressors"] = MONGO_COMPRESSORS
+for operation, mode in MONGO_READ_POLICY.items():
+    if mode not in READ_PREFERENCES:
+        raise ValueError(f"MONGO_{operation.upper()}_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}")
+if MONGO_MAX_STALENESS_SECONDS != -1 and MONGO_MAX_STALENESS_SECONDS < 90:
+    raise ValueError("MONGO_MAX_STALENESS_SECONDS must be -1 or at least 90")
+
+def make_read_preference(mode: str):
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL, **mongo_client_options)
 db = client.portfolio_db
+read_dbs = {
+    operation: client.get_database("portfolio_db", read_preference=make_read_preference(mode))
+    for operation, mode in MONGO_READ_POLICY.items()
+}
+
+def read_db(operation: str):
+    """Database handle carrying the read preference of a lag tolerant operation"""
+    return read_dbs[operation]
+
+def read_routing_summary():
+    return {
+        operation: {"mode": mode, "max_staleness_seconds": None if mode == "primary" else MONGO_MAX_STALENESS_SECONDS}
+        for operation, mode in MONGO_READ_POLICY.items()
+    }
+
+async def print_read_routing():
+    """Show which replica set member serves each routed operation (and CRUD)"""
+    handles = {"crud": db, **read_dbs}
+    for operation, handle in handles.items():
+        hello = await handle.command("hello", read_preference=handle.read_preference)
+        if "setName" in hello:
+            role = "primary" if hello.get("isWritablePrimary") else "secondary" if hello.get("secondary") else "other"
+            served_by = f"{hello.get('me')} ({role}, replica set {hello['setName']})"
+        else:
+            served_by = "standalone server"
+        print(f"  {operation:<10} {handle.read_preference!r} -> {served_by}")
 
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here-change-in-production")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64))
+
 # Password hashing - Fix bcrypt compatibility issue
 try:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 except Exception as e:
     print(f"Bcrypt initialization error: {e}")
     # Fallback to simple bcrypt
     def get_password_hash(password):
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
     
     def verify_password(plain_password, hashed_password):
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     
     pwd_context = None
 
+# Bcrypt is CPU bound and blocks for hundreds of milliseconds, so it runs on a
+# dedicated bounded pool instead of the event loop
+password_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_hash_stats = {
+    "in_flight": 0,    # Admitted jobs, running or waiting
+    "queue_depth": 0,  # Jobs waiting for a free worker
+    "max_queue_depth": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "rehashed": 0
+}
+
 # Security
 security = HTTPBearer()
 
+def hit_rate(hits: int, misses: int):
+    """Cache hit percentage for the metrics endpoint"""
+    lookups = hits + misses
+    return round(hits / lookups * 100, 1) if lookups else 0
+
+# Authenticated user cache
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+
+class UserCache:
+    """Per-process TTL + LRU cache of user documents keyed by user id"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return dict(entry[1])
+
+    def set(self, user_id: str, user: dict):
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, dict(user))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hit_rate(self.hits, self.misses)
+        }
+
+user_cache = UserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
 # Create uploads directory
 upload_dir = Path("uploads")
 upload_dir.mkdir(exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
 
 # Create exports directory for PDFs
 export_dir = Path("exports")
 export_dir.mkdir(exist_ok=True)
 app.mount("/exports", StaticFiles(directory="exports"), name="exports")
 
+# ReportLab rendering is CPU bound, so PDFs are built in worker processes
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", 2))
+pdf_render_executor = ProcessPoolExecutor(max_workers=PDF_RENDER_WORKERS)
+
 # Pydantic models
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import Any, Dict
 
 class UserLogin(BaseModel):
@@ -115,6 +410,12 @@ class UserResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class UserSummary(BaseModel):
+    id: str
+    name: str
+    title: Optional[str] = None
+    created_at: datetime
+
 class ProjectCreate(BaseModel):
     title: str
     description: str
@@ -142,6 +443,16 @@ class ProjectResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class ProjectSummary(BaseModel):
+    id: str
+    title: str
+    status: str
+    priority: str
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -150,6 +461,18 @@ class TaskCreate(BaseModel):
     due_date: Optional[datetime] = None
     estimated_hours: Optional[float] = None
 
+class TaskBulkUpdate(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    due_date: Optional[datetime] = None
+    estimated_hours: Optional[float] = None
+
+class TaskBulkDelete(BaseModel):
+    task_ids: List[str]
+
 class TaskResponse(BaseModel):
     id: str
     project_id: str
@@ -184,7 +507,51 @@ def get_password_hash(password):
     if pwd_context:
         return pwd_context.hash(password)
     else:
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def password_needs_rehash(hashed_password):
+    """Check whether a stored bcrypt hash uses a different cost than BCRYPT_ROUNDS"""
+    if pwd_context is not None:
+        return pwd_context.needs_update(hashed_password)
+    try:
+        # Modular crypt format: $2b$<cost>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+def set_password_hash_in_flight(delta: int):
+    # The pool runs jobs in submission order, so every job beyond the worker
+    # count is waiting
+    password_hash_stats["in_flight"] += delta
+    password_hash_stats["queue_depth"] = max(password_hash_stats["in_flight"] - PASSWORD_HASH_WORKERS, 0)
+    password_hash_stats["max_queue_depth"] = max(password_hash_stats["max_queue_depth"], password_hash_stats["queue_depth"])
+
+async def run_password_hash_job(func, *args):
+    """Run a bcrypt operation on the password hashing pool"""
+    if password_hash_stats["queue_depth"] >= PASSWORD_HASH_MAX_QUEUE:
+        password_hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, please retry"
+        )
+    
+    set_password_hash_in_flight(1)
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(password_hash_executor, func, *args)
+    except Exception:
+        password_hash_stats["failed"] += 1
+        raise
+    finally:
+        set_password_hash_in_flight(-1)
+    password_hash_stats["completed"] += 1
+    return result
+
+async def hash_password_async(password):
+    return await run_password_hash_job(get_password_hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await run_password_hash_job(verify_password, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -210,11 +577,16 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
     user = await db.users.find_one({"id": user_id})
     if user is None:
         raise credentials_exception
     if "_id" in user:
         del user["_id"]  # Remove MongoDB ObjectId
+    user_cache.set(user_id, user)
     return user
 
 async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
@@ -239,7 +611,7 @@ async def create_demo_user(user_data):
         
     user_id = generate_id()
     now = datetime.utcnow()
-    hashed_password = get_password_hash(user_data["password"])
+    hashed_password = await hash_password_async(user_data["password"])
     
     user_doc = {
         "id": user_id,
@@ -265,16 +637,830 @@ async def get_user_by_id(user_id: str):
         del user["_id"]  # Remove MongoDB ObjectId
     return user
 
+# Projects being purged keep their document, marked with deleted_at, until the
+# background purge finishes; every project read filters on this
+LIVE_PROJECT = {"deleted_at": None}
+
+async def purging_project_ids(user_id: str) -> List[str]:
+    """Deleted projects whose tasks still exist; owner-wide task queries exclude them"""
+    return [
+        deletion["project_id"] async for deletion in db.project_deletions.find(
+            {"user_id": user_id, "status": {"$ne": "completed"}}, {"_id": 0, "project_id": 1}
+        )
+    ]
+
 async def get_project_by_id(project_id: str):
-    project = await db.projects.find_one({"id": project_id})
+    project = await db.projects.find_one({"id": project_id, **LIVE_PROJECT})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     if "_id" in project:
         del project["_id"]  # Remove MongoDB ObjectId
     return project
 
+async def raise_not_found_or_denied(collection, query: dict, not_found: str):
+    """Explain why an ownership-filtered write matched nothing"""
+    if await collection.find_one(query, {"_id": 1}):
+        raise HTTPException(status_code=403, detail="Access denied")
+    raise HTTPException(status_code=404, detail=not_found)
+
+# Keyset pagination
+# List endpoints are ordered newest first by (created_at, id). The opaque
+# "after" cursor encodes the last row of a page; the next page's cursor is
+# returned in the X-Next-Cursor header so list responses keep their shape.
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 200))
+KEYSET_SORT = [("created_at", -1), ("id", -1)]
+
+def clamp_page_size(limit: int):
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(doc: dict):
+    payload = json.dumps([doc["created_at"].isoformat(), doc["id"]])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def apply_keyset_cursor(query: dict, after: Optional[str]):
+    """Restrict a query to rows strictly after the cursor position"""
+    if not after:
+        return query
+    try:
+        created_at, last_id = json.loads(base64.urlsafe_b64decode(after.encode('ascii')))
+        created_at = datetime.fromisoformat(created_at)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    
+    query.setdefault("$and", []).append({"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": last_id}}
+    ]})
+    return query
+
+def set_next_cursor(response: Response, docs: List[dict], limit: int):
+    if len(docs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1])
+
+# Field projection for list endpoints
+# fields=summary selects the compact summary model, fields=a,b,c selects any
+# response model fields; id and created_at are always included for cursors
+def resolve_projection(fields: Optional[str], model, summary_model):
+    """Translate a fields= parameter into a Mongo projection (None means full documents)"""
+    if not fields:
+        return None
+    if fields == "summary":
+        names = set(summary_model.model_fields)
+    else:
+        names = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = names - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return {"_id": 0, "id": 1, "created_at": 1, **{name: 1 for name in names}}
+
+def projected_response(docs: List[dict], fields: str, summary_model, response: Response):
+    """Serialize projected rows directly, skipping the full response model"""
+    if FAST_JSON_RESPONSES:
+        return orjson_response(trusted_rows(docs, summary_model) if fields == "summary" else docs, response)
+    if fields == "summary":
+        docs = [summary_model(**doc) for doc in docs]
+    return JSONResponse(content=jsonable_encoder(docs), headers=dict(response.headers))
+
+# Fast read serialization
+# Documents on the read paths were validated when they were written, so with
+# FAST_JSON_RESPONSES enabled they are copied into the response model's shape
+# and rendered with orjson instead of being re-validated row by row
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+def trusted_rows(docs: List[dict], model) -> List[dict]:
+    """Shape stored documents like `model` without validating them"""
+    defaults = {
+        name: None if info.is_required() else info.get_default(call_default_factory=True)
+        for name, info in model.model_fields.items()
+    }
+    return [{name: doc.get(name, default) for name, default in defaults.items()} for doc in docs]
+
+def orjson_response(rows: List[dict], response: Response) -> Response:
+    """Render rows with orjson, keeping headers set on the injected response"""
+    return Response(content=orjson.dumps(rows), media_type="application/json", headers=dict(response.headers))
+
+# Database indexes matching the query shapes of the hot endpoints
+INDEX_PLAN = [
+    ("users", [("id", 1)], {"name": "users_id_unique", "unique": True}),
+    ("users", [("email", 1)], {"name": "users_email_unique", "unique": True}),
+    # get_users keyset pagination
+    ("users", [("created_at", -1), ("id", -1)], {"name": "users_created_id"}),
+    ("projects", [("id", 1)], {"name": "projects_id_unique", "unique": True}),
+    # get_projects / export_pdf / NDJSON export: filter by owner, newest first (keyset on created_at, id)
+    ("projects", [("user_id", 1), ("created_at", -1), ("id", -1)], {"name": "projects_user_created_id"}),
+    # get_projects status filter, advanced_search status filter
+    ("projects", [("user_id", 1), ("status", 1), ("created_at", -1), ("id", -1)], {"name": "projects_user_status_created_id"}),
+    # Startup recovery of interrupted project purges
+    ("projects", [("deleted_at", 1)], {"name": "projects_deleted_at", "sparse": True}),
+    ("user_stats", [("user_id", 1)], {"name": "user_stats_user_unique", "unique": True}),
+    ("project_deletions", [("project_id", 1)], {"name": "project_deletions_project_unique", "unique": True}),
+    # purging_project_ids
+    ("project_deletions", [("user_id", 1), ("status", 1)], {"name": "project_deletions_user_status"}),
+    ("export_jobs", [("id", 1)], {"name": "export_jobs_id_unique", "unique": True}),
+    # At most one queued/running job per identical export request
+    ("export_jobs", [("active_key", 1)], {"name": "export_jobs_active_key_unique", "unique": True, "sparse": True}),
+    ("upload_blobs", [("filename", 1)], {"name": "upload_blobs_filename_unique", "unique": True}),
+    # Orphaned blob sweep
+    ("upload_blobs", [("ref_count", 1), ("updated_at", 1)], {"name": "upload_blobs_refcount_updated"}),
+    # Text search over a user's projects; $text queries must match user_id
+    ("projects", [("user_id", 1), ("title", "text"), ("description", "text"), ("technologies", "text"), ("tags", "text")], {
+        "name": "projects_user_text",
+        "weights": {"title": 10, "technologies": 5, "tags": 5, "description": 1},
+        "default_language": "english"
+    }),
+    ("users", [("name", "text"), ("title", "text"), ("skills", "text")], {
+        "name": "users_text",
+        "weights": {"name": 10, "skills": 5, "title": 3},
+        "default_language": "english"
+    }),
+    ("tasks", [("id", 1)], {"name": "tasks_id_unique", "unique": True}),
+    # get_project_tasks: filter by project, newest first (keyset on created_at, id)
+    ("tasks", [("project_id", 1), ("created_at", -1), ("id", -1)], {"name": "tasks_project_created_id"}),
+    # get_project_tasks status filter, analytics completed counts
+    ("tasks", [("project_id", 1), ("status", 1), ("created_at", -1), ("id", -1)], {"name": "tasks_project_status_created_id"}),
+    # Analytics task totals and user-wide task filters on the denormalized owner
+    ("tasks", [("user_id", 1), ("status", 1)], {"name": "tasks_user_status"}),
+    # Text search over a user's tasks; $text queries must match user_id
+    ("tasks", [("user_id", 1), ("title", "text"), ("description", "text")], {
+        "name": "tasks_user_text",
+        "weights": {"title": 5, "description": 1},
+        "default_language": "english"
+    }),
+]
+
+# Indexes replaced by entries in INDEX_PLAN; dropped before it is applied
+RETIRED_INDEXES = [
+    ("tasks", "tasks_text"),  # Superseded by tasks_user_text (a collection has one text index)
+]
+
+# Representative queries used to verify the plan with explain()
+INDEX_EXPLAIN_QUERIES = [
+    ("users", {"email": "john.doe@demo.com"}, None),
+    ("users", {"id": "sample-user-id"}, None),
+    ("projects", {"id": "sample-project-id"}, None),
+    ("users", {}, KEYSET_SORT),
+    ("projects", {"user_id": "sample-user-id"}, KEYSET_SORT),
+    ("projects", {"user_id": "sample-user-id", "status": "completed"}, None),
+    ("tasks", {"project_id": "sample-project-id"}, KEYSET_SORT),
+    ("tasks", {"user_id": "sample-user-id", "status": "completed"}, None),
+]
+
+async def ensure_indexes():
+    """Create all indexes in INDEX_PLAN; existing indexes are left untouched"""
+    for collection, name in RETIRED_INDEXES:
+        try:
+            await db[collection].drop_index(name)
+        except OperationFailure:
+            pass  # Already dropped
+    for collection, keys, options in INDEX_PLAN:
+        try:
+            await db[collection].create_index(keys, background=True, **options)
+        except Exception as e:
+            print(f"Index creation failed for {collection}.{options['name']}: {e}")
+
+def summarize_winning_plan(explain: dict):
+    """Flatten an explain() winning plan into (stages, index names)"""
+    query_planner = explain.get("queryPlanner", {})
+    plan = query_planner.get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # slot based engine nests the plan
+    stages, indexes = [], []
+    pending = [plan]
+    while pending:
+        node = pending.pop()
+        if node.get("stage"):
+            stages.append(node["stage"])
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+        if node.get("inputStage"):
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages, indexes
+
+async def print_index_plan(apply: bool = False):
+    print("Index plan:")
+    for collection, keys, options in INDEX_PLAN:
+        key_text = ", ".join(f"{field}: {direction}" for field, direction in keys)
+        unique_text = " (unique)" if options.get("unique") else ""
+        print(f"  {collection}.{options['name']}: {{{key_text}}}{unique_text}")
+    
+    if apply:
+        await ensure_indexes()
+        print("Indexes created")
+    
+    print("\nExplain verification:")
+    for collection, query, sort in INDEX_EXPLAIN_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages, indexes = summarize_winning_plan(await cursor.explain())
+        verdict = "OK" if indexes and "COLLSCAN" not in stages else "COLLSCAN"
+        sort_text = f" sort={dict(sort)}" if sort else ""
+        print(f"  [{verdict}] {collection} {query}{sort_text} -> {' <- '.join(stages)} {indexes}")
+
+# Per-user analytics rollup
+# Each user has one user_stats document maintained incrementally by the project
+# and task handlers, so dashboards read O(1) state instead of scanning.
+# purging_projects lists deleted projects whose tasks are still being purged.
+def stats_key(value) -> str:
+    """Make a status/type value safe to use as a document field name"""
+    return str(value).replace(".", "_").replace("$", "_")
+
+def month_key(value: datetime) -> str:
+    return value.strftime("%Y-%m")
+
+def user_stats_pipeline(user_id: str):
+    """Aggregation recomputing every rollup counter for a user from scratch"""
+    return [
+        {"$match": {"user_id": user_id, **LIVE_PROJECT}},
+        {"$facet": {
+            "status_counts": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ],
+            "project_types": [
+                {"$group": {"_id": "$project_type", "count": {"$sum": 1}}}
+            ],
+            "monthly_activity": [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                    "count": {"$sum": 1}
+                }}
+            ]
+        }}
+    ]
+
+def user_task_totals_pipeline(user_id: str, excluded_project_ids: List[str]):
+    """Task counters straight from the tasks' owner field"""
+    match = {"user_id": user_id}
+    if excluded_project_ids:
+        match["project_id"] = {"$nin": excluded_project_ids}
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": None,
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+        }}
+    ]
+
+async def rebuild_user_stats(user_id: str):
+    """Recompute a user's rollup document, reconciling any drift"""
+    # Empty portfolios skip the aggregations; every counter is zero
+    has_projects, purging = await asyncio.gather(
+        db.projects.find_one({"user_id": user_id, **LIVE_PROJECT}, {"_id": 1}),
+        purging_project_ids(user_id)
+    )
+    if has_projects:
+        facets, task_totals = await asyncio.gather(
+            db.projects.aggregate(user_stats_pipeline(user_id)).to_list(length=1),
+            db.tasks.aggregate(user_task_totals_pipeline(user_id, purging)).to_list(length=1)
+        )
+    else:
+        facets, task_totals = [], []
+    facets = facets[0] if facets else {}
+    
+    by_status = {stats_key(sc["_id"]): sc["count"] for sc in facets.get("status_counts", [])}
+    task_totals = task_totals or [{}]
+    stats = {
+        "user_id": user_id,
+        "projects": {
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "by_type": {stats_key(pt["_id"]): pt["count"] for pt in facets.get("project_types", [])},
+            "monthly": {ma["_id"]: ma["count"] for ma in facets.get("monthly_activity", []) if ma["_id"]}
+        },
+        "tasks": {
+            "total": task_totals[0].get("total", 0),
+            "completed": task_totals[0].get("completed", 0)
+        },
+        "purging_projects": purging,
+        "updated_at": datetime.utcnow()
+    }
+    
+    await db.user_stats.replace_one({"user_id": user_id}, stats, upsert=True)
+    analytics_service.invalidate(user_id)
+    return stats
+
+async def get_user_stats(user_id: str, primary: bool = False):
+    source = db if primary else read_db("analytics")
+    stats = await source.user_stats.find_one({"user_id": user_id})
+    if stats is None:
+        # Built lazily the first time a user's analytics are read
+        stats = await rebuild_user_stats(user_id)
+    return stats
+
+async def increment_user_stats(user_id: str, increments: dict, project_id: Optional[str] = None, purge_started: bool = False):
+    """Apply counter deltas to an existing rollup document.
+    
+    Deltas for one project's tasks pass its project_id. A deleted project's
+    tasks are subtracted in one go when the deletion is counted
+    (purge_started), which also lists it in purging_projects; later deltas
+    for its tasks are then dropped instead of being subtracted twice.
+    """
+    increments = {field: delta for field, delta in increments.items() if delta}
+    if not increments:
+        return
+    query = {"user_id": user_id}
+    update = {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}
+    if project_id:
+        query["purging_projects"] = {"$ne": project_id}
+        if purge_started:
+            update["$addToSet"] = {"purging_projects": project_id}
+    # No upsert: a missing document is rebuilt in full on the next read
+    await db.user_stats.update_one(query, update)
+    analytics_service.invalidate(user_id)
+
+def project_stats_increments(project: dict, delta: int):
+    return {
+        "projects.total": delta,
+        f"projects.by_status.{stats_key(project['status'])}": delta,
+        f"projects.by_type.{stats_key(project['project_type'])}": delta,
+        f"projects.monthly.{month_key(project['created_at'])}": delta
+    }
+
+def format_user_analytics(stats: dict):
+    """Shape a rollup document into the dashboard analytics response"""
+    by_status = stats["projects"]["by_status"]
+    total_projects = stats["projects"]["total"]
+    completed_projects = by_status.get("completed", 0)
+    in_progress_projects = by_status.get("in-progress", 0)
+    total_tasks = stats["tasks"]["total"]
+    completed_tasks = stats["tasks"]["completed"]
+    
+    # Activity over time (monthly breakdown for the past year)
+    year_ago = month_key(datetime.utcnow() - timedelta(days=365))
+    monthly_activity = [
+        {"_id": {"year": int(month[:4]), "month": int(month[5:7])}, "count": count}
+        for month, count in sorted(stats["projects"]["monthly"].items())
+        if month >= year_ago and count > 0
+    ]
+    
+    return {
+        "projects": {
+            "total": total_projects,
+            "completed": completed_projects,
+            "in_progress": in_progress_projects,
+            "completion_rate": round((completed_projects / total_projects * 100) if total_projects > 0 else 0, 1)
+        },
+        "tasks": {
+            "total": total_tasks,
+            "completed": completed_tasks,
+            "completion_rate": round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
+        },
+        "project_types": {project_type: count for project_type, count in stats["projects"]["by_type"].items() if count > 0},
+        "monthly_activity": monthly_activity
+    }
+
+async def compute_user_analytics(user_id: str, primary: bool = False):
+    """Dashboard analytics for one user, as served by the dashboard and PDF exports"""
+    return format_user_analytics(await get_user_stats(user_id, primary))
+
+# Analytics service
+# Dashboards and exports read analytics through analytics_service: concurrent
+# callers for one user share a single in-flight computation, and results are
+# cached for a few seconds. Rollup writes in this process invalidate the cache.
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", 5))
+ANALYTICS_CACHE_MAX_SIZE = int(os.getenv("ANALYTICS_CACHE_MAX_SIZE", 10000))
+
+class AnalyticsService:
+    """Single-flight, briefly cached compute_user_analytics per user.
+    
+    The first computation after an invalidation reads the rollup from the
+    primary, so a lagging secondary cannot put pre-write analytics back into
+    the cache. Callers always get their own copy of the result.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache = UserCache(max_size, ttl_seconds)
+        self._in_flight = {}
+        self._written = OrderedDict()  # Invalidated since their last primary read, oldest first
+        self._max_written = max_size
+        self.computed = 0
+        self.coalesced = 0
+
+    async def get(self, user_id: str):
+        analytics = self._cache.get(user_id)
+        if analytics is not None:
+            return copy.deepcopy(analytics)
+        task = self._in_flight.get(user_id)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(user_id))
+            self._in_flight[user_id] = task
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the computation other callers share
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _compute(self, user_id: str):
+        task = asyncio.current_task()
+        try:
+            analytics = await compute_user_analytics(user_id, primary=user_id in self._written)
+            self.computed += 1
+            # An invalidation during the computation detaches it from _in_flight;
+            # its result may predate the write, so its callers get it uncached
+            if self._in_flight.get(user_id) is task:
+                self._written.pop(user_id, None)
+                self._cache.set(user_id, analytics)
+            return analytics
+        finally:
+            if self._in_flight.get(user_id) is task:
+                del self._in_flight[user_id]
+
+    def invalidate(self, user_id: str):
+        self._cache.invalidate(user_id)
+        # Later callers start a fresh computation instead of joining one that
+        # may have read the rollup before this write
+        self._in_flight.pop(user_id, None)
+        self._written[user_id] = None
+        self._written.move_to_end(user_id)
+        while len(self._written) > self._max_written:
+            self._written.popitem(last=False)
+
+    def stats(self):
+        return {
+            **self._cache.stats(),
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
+
+analytics_service = AnalyticsService(ANALYTICS_CACHE_MAX_SIZE, ANALYTICS_CACHE_TTL_SECONDS)
+
+async def rebuild_all_user_stats(user_id: Optional[str] = None):
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = [u["id"] async for u in db.users.find({}, {"id": 1})]
+    for uid in user_ids:
+        stats = await rebuild_user_stats(uid)
+        print(f"  {uid}: {stats['projects']['total']} projects, {stats['tasks']['total']} tasks")
+    print(f"Rebuilt analytics for {len(user_ids)} users")
+
+# Task owner backfill
+# Tasks carry their project's user_id so user-wide task queries filter on one
+# indexed field. Tasks written before that field existed are migrated here.
+TASK_OWNER_BACKFILL_BATCH = 500
+
+async def backfill_task_owners():
+    """Copy each project's owner onto its tasks that have no user_id yet"""
+    if not await db.tasks.find_one({"user_id": {"$exists": False}}, {"_id": 1}):
+        return 0
+    updated = 0
+    operations = []
+    async for project in db.projects.find({}, {"_id": 0, "id": 1, "user_id": 1}):
+        operations.append(UpdateMany(
+            {"project_id": project["id"], "user_id": {"$exists": False}},
+            {"$set": {"user_id": project["user_id"]}}
+        ))
+        if len(operations) >= TASK_OWNER_BACKFILL_BATCH:
+            updated += (await db.tasks.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        updated += (await db.tasks.bulk_write(operations, ordered=False)).modified_count
+    print(f"Backfilled user_id on {updated} tasks")
+    return updated
+
+# Search
+# "memory" mode queries the in-process inverted index (prefix matching, BM25),
+# "text" mode uses the Mongo text indexes (stemming, relevance score) and
+# "regex" mode is the unindexed fallback, used automatically if a text index
+# is missing
+SEARCH_MODES = ("memory", "text", "regex")
+PROJECT_SEARCH_FIELDS = ["title", "description", "technologies", "tags"]
+TASK_SEARCH_FIELDS = ["title", "description"]
+USER_SEARCH_FIELDS = ["name", "title", "skills"]
+
+def validate_search_mode(mode: str, modes=SEARCH_MODES):
+    if mode not in modes:
+        raise HTTPException(status_code=400, detail=f"Invalid search mode, expected one of: {', '.join(modes)}")
+
+def regex_search_clause(search: str, fields: List[str]):
+    """Case-insensitive substring match; input is escaped so it is matched literally"""
+    pattern = {"$regex": re.escape(search), "$options": "i"}
+    return {"$or": [{field: pattern} for field in fields]}
+
+SEARCH_SUBQUERY_TIMEOUT_MS = int(os.getenv("SEARCH_SUBQUERY_TIMEOUT_MS", 2000))
+
+async def search_collection(collection: str, base_query: dict, search: str, fields: List[str],
+                            limit: int, mode: str = "text", projection: Optional[dict] = None,
+                            stages: Optional[List[dict]] = None):
+    """Search one collection, best matches first in text mode.
+    
+    stages filter the matches before the limit is applied; the search then
+    runs as a single aggregation instead of a find.
+    """
+    projection = {"_id": 0, **(projection or {})}
+    source = read_db("search")[collection]
+    
+    async def run(query: dict, ranked: bool):
+        if stages is None:
+            cursor = source.find(query, {**projection, "score": {"$meta": "textScore"}} if ranked else projection)
+            if ranked:
+                cursor = cursor.sort([("score", {"$meta": "textScore"})])
+            cursor = cursor.limit(limit).max_time_ms(SEARCH_SUBQUERY_TIMEOUT_MS)
+        else:
+            pipeline = [{"$match": query}]
+            if ranked:
+                pipeline += [
+                    {"$addFields": {"score": {"$meta": "textScore"}}},
+                    {"$sort": {"score": {"$meta": "textScore"}}}
+                ]
+            pipeline += [*stages, {"$limit": limit}, {"$project": projection}]
+            cursor = source.aggregate(pipeline, maxTimeMS=SEARCH_SUBQUERY_TIMEOUT_MS)
+        return await cursor.to_list(length=limit)
+    
+    if mode == "text":
+        try:
+            return await run({**base_query, "$text": {"$search": search}}, ranked=True)
+        except ExecutionTimeout:
+            raise
+        except OperationFailure:
+            # Text index not built (yet); fall back to regex matching
+            pass
+    
+    return await run({**base_query, **regex_search_clause(search, fields)}, ranked=False)
+
+# Drops tasks whose project has a deletion record, i.e. is being purged
+LIVE_TASK_STAGES = [
+    {"$lookup": {"from": "project_deletions", "localField": "project_id", "foreignField": "project_id", "as": "deletion"}},
+    {"$match": {"deletion.0": {"$exists": False}}},
+    {"$project": {"deletion": 0}}
+]
+
+async def search_user_tasks(user_id: str, filters: dict, search: str, limit: int, mode: str = "text"):
+    """Search a user's tasks through their denormalized owner field.
+    
+    Project liveness is checked by a $lookup in the same aggregation, so the
+    search stays a single round trip.
+    """
+    return await search_collection(
+        "tasks", {"user_id": user_id, **filters}, search, TASK_SEARCH_FIELDS, limit, mode, stages=LIVE_TASK_STAGES
+    )
+
+# In-process inverted index
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+SEARCH_INDEX_WARM_ATTEMPTS = int(os.getenv("SEARCH_INDEX_WARM_ATTEMPTS", 3))
+SEARCH_INDEX_WARM_RETRY_SECONDS = float(os.getenv("SEARCH_INDEX_WARM_RETRY_SECONDS", 30))
+SEARCH_INDEX_TEXT_FIELDS = {
+    "projects": ["title", "description", "technologies", "tags"],
+    "tasks": ["title", "description"]
+}
+SEARCH_INDEX_FILTER_FIELDS = {
+    "projects": ["status", "project_type", "priority"],
+    "tasks": ["status", "priority"]
+}
+
+class SearchPartition:
+    """Inverted index over one user's projects or tasks"""
+
+    def __init__(self):
+        self.postings = {}   # token -> {doc_id: term frequency}
+        self.tokens = []     # sorted vocabulary for prefix lookups
+        self.documents = {}  # doc_id -> (length, filter fields, distinct tokens)
+        self.total_length = 0
+
+    def add(self, doc_id: str, tokens: List[str], fields: dict):
+        self.remove(doc_id)
+        term_counts = Counter(tokens)
+        for token, tf in term_counts.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                bisect.insort(self.tokens, token)
+            posting[doc_id] = tf
+        self.documents[doc_id] = (len(tokens), fields, tuple(term_counts))
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id: str):
+        entry = self.documents.pop(doc_id, None)
+        if entry is None:
+            return
+        length, _, tokens = entry
+        self.total_length -= length
+        for token in tokens:
+            posting = self.postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def search(self, terms: List[str], limit: int, filters: dict, k1: float = 1.2, b: float = 0.75):
+        """BM25 ranking; each query term matches every token it prefixes"""
+        doc_count = len(self.documents)
+        if not doc_count:
+            return []
+        avg_length = self.total_length / doc_count or 1
+        
+        scores = defaultdict(float)
+        for term in terms:
+            i = bisect.bisect_left(self.tokens, term)
+            while i < len(self.tokens) and self.tokens[i].startswith(term):
+                posting = self.postings[self.tokens[i]]
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    length = self.documents[doc_id][0]
+                    scores[doc_id] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+                i += 1
+        
+        if filters:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if all(self.documents[doc_id][1].get(field) == value for field, value in filters.items())
+            }
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+class SearchIndex:
+    """Per-user inverted indexes of projects and tasks, kept in sync by the CRUD handlers"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.ready = False
+        self.partitions = {}      # (user_id, kind) -> SearchPartition
+        self.project_owners = {}  # project_id -> user_id
+        self.project_tasks = defaultdict(set)  # project_id -> task ids
+        self.task_projects = {}   # task_id -> project_id
+        self.removed = set()      # ids removed during warm-up; the warm-up pass must not restore them
+
+    @staticmethod
+    def tokenize(text: str):
+        return re.findall(r"[a-z0-9]+", text.lower())
+
+    def _document_tokens(self, kind: str, doc: dict):
+        tokens = []
+        for field in SEARCH_INDEX_TEXT_FIELDS[kind]:
+            value = doc.get(field)
+            if isinstance(value, list):
+                value = " ".join(str(v) for v in value)
+            if value:
+                tokens.extend(self.tokenize(str(value)))
+        return tokens
+
+    def _add(self, user_id: str, kind: str, doc: dict):
+        fields = {field: doc.get(field) for field in SEARCH_INDEX_FILTER_FIELDS[kind]}
+        partition = self.partitions.setdefault((user_id, kind), SearchPartition())
+        partition.add(doc["id"], self._document_tokens(kind, doc), fields)
+
+    def disable(self):
+        """Stop maintaining the index and release everything it holds"""
+        self.enabled = False
+        self.ready = False
+        self.partitions.clear()
+        self.project_owners.clear()
+        self.project_tasks.clear()
+        self.task_projects.clear()
+        self.removed.clear()
+
+    def index_project(self, project: dict):
+        if not self.enabled:
+            return
+        self.project_owners[project["id"]] = project["user_id"]
+        self._add(project["user_id"], "projects", project)
+
+    def warm(self, kind: str, doc: dict):
+        """Index a document read by the warm-up pass.
+        
+        The CRUD handlers run during warm-up too. A document they already
+        indexed is newer than the warm-up read, and one they removed stays
+        removed.
+        """
+        if not self.enabled:
+            return
+        known = self.project_owners if kind == "projects" else self.task_projects
+        if doc["id"] in known or doc["id"] in self.removed:
+            return
+        if kind == "projects":
+            self.index_project(doc)
+        elif doc["project_id"] not in self.removed:
+            self.index_task(doc)
+
+    def index_task(self, task: dict):
+        if not self.enabled:
+            return
+        user_id = self.project_owners.get(task["project_id"])
+        if user_id is None:
+            return  # Project not loaded yet; the warm-up pass indexes it later
+        self.task_projects[task["id"]] = task["project_id"]
+        self.project_tasks[task["project_id"]].add(task["id"])
+        self._add(user_id, "tasks", task)
+
+    def remove_task(self, task_id: str):
+        if not self.enabled:
+            return
+        if not self.ready:
+            self.removed.add(task_id)
+        project_id = self.task_projects.pop(task_id, None)
+        if project_id is None:
+            return
+        project_tasks = self.project_tasks.get(project_id)
+        if project_tasks is not None:
+            project_tasks.discard(task_id)
+        partition = self.partitions.get((self.project_owners.get(project_id), "tasks"))
+        if partition:
+            partition.remove(task_id)
+
+    def remove_project(self, project_id: str):
+        if not self.enabled:
+            return
+        if not self.ready:
+            self.removed.add(project_id)
+        for task_id in list(self.project_tasks.pop(project_id, ())):
+            self.remove_task(task_id)
+        user_id = self.project_owners.pop(project_id, None)
+        partition = self.partitions.get((user_id, "projects"))
+        if partition:
+            partition.remove(project_id)
+
+    def search(self, user_id: str, kind: str, query: str, limit: int, filters: dict):
+        partition = self.partitions.get((user_id, kind))
+        if partition is None:
+            return []
+        return partition.search(self.tokenize(query), limit, {k: v for k, v in filters.items() if v})
+
+    def stats(self, include_memory: bool = False):
+        documents = sum(len(p.documents) for p in self.partitions.values())
+        stats = {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "partitions": len(self.partitions),
+            "documents": documents,
+            "tokens": sum(len(p.tokens) for p in self.partitions.values()),
+            "postings": sum(len(posting) for p in self.partitions.values() for posting in p.postings.values())
+        }
+        if include_memory:
+            # Walks every structure, so only computed on request
+            memory_bytes = self.estimated_bytes()
+            stats["estimated_bytes"] = memory_bytes
+            stats["bytes_per_million_documents"] = round(memory_bytes / documents * 1_000_000) if documents else 0
+        return stats
+
+    def estimated_bytes(self):
+        total = sum(sys.getsizeof(m) for m in (self.partitions, self.project_owners, self.project_tasks, self.task_projects))
+        total += sum(sys.getsizeof(tasks) for tasks in self.project_tasks.values())
+        for partition in self.partitions.values():
+            total += sys.getsizeof(partition.postings) + sys.getsizeof(partition.tokens) + sys.getsizeof(partition.documents)
+            for token, posting in partition.postings.items():
+                total += sys.getsizeof(token) + sys.getsizeof(posting)
+            for doc_id, (_, fields, tokens) in partition.documents.items():
+                total += sys.getsizeof(doc_id) + sys.getsizeof(fields) + sys.getsizeof(tokens) + 64
+        return total
+
+search_index = SearchIndex(SEARCH_INDEX_ENABLED)
+
+async def build_search_index():
+    """Warm the in-memory index from Mongo; searches use Mongo until it is ready.
+    
+    Failed passes are retried. Until a pass completes, removals are tracked
+    so the warm-up does not restore them, so after the last failed attempt
+    the index is disabled rather than left to grow.
+    """
+    for attempt in range(1, SEARCH_INDEX_WARM_ATTEMPTS + 1):
+        try:
+            await warm_search_index()
+            return
+        except Exception as e:
+            print(f"Search index warm-up failed (attempt {attempt}/{SEARCH_INDEX_WARM_ATTEMPTS}): {e}")
+        if attempt < SEARCH_INDEX_WARM_ATTEMPTS:
+            await asyncio.sleep(SEARCH_INDEX_WARM_RETRY_SECONDS * attempt)
+    search_index.disable()
+    print("Search index disabled; searches will use Mongo")
+
+async def warm_search_index():
+    started = time.monotonic()
+    project_fields = {"_id": 0, "id": 1, "user_id": 1, **{f: 1 for f in SEARCH_INDEX_TEXT_FIELDS["projects"] + SEARCH_INDEX_FILTER_FIELDS["projects"]}}
+    async for project in db.projects.find(LIVE_PROJECT, project_fields):
+        search_index.warm("projects", project)
+    
+    task_fields = {"_id": 0, "id": 1, "project_id": 1, **{f: 1 for f in SEARCH_INDEX_TEXT_FIELDS["tasks"] + SEARCH_INDEX_FILTER_FIELDS["tasks"]}}
+    async for task in db.tasks.find({}, task_fields):
+        search_index.warm("tasks", task)
+    
+    search_index.ready = True
+    search_index.removed.clear()
+    stats = search_index.stats()
+    print(f"Search index ready: {stats['documents']} documents in {time.monotonic() - started:.1f}s")
+
+async def fetch_ranked(collection: str, ranked: List[tuple], user_id: str):
+    """Load documents for ranked (id, score) pairs, preserving rank order.
+    
+    The index is only a hint: the fetch re-checks ownership, and tasks are
+    dropped unless the index still holds their project (deleted projects are
+    removed from it before their purge starts).
+    """
+    if not ranked:
+        return []
+    query = {"id": {"$in": [doc_id for doc_id, _ in ranked]}, "user_id": user_id}
+    if collection == "projects":
+        query.update(LIVE_PROJECT)
+    docs = await read_db("search")[collection].find(query, {"_id": 0}).to_list(length=len(ranked))
+    if collection == "tasks":
+        docs = [doc for doc in docs if search_index.project_owners.get(doc["project_id"]) == user_id]
+    docs_by_id = {doc["id"]: doc for doc in docs}
+    return [
+        {**docs_by_id[doc_id], "score": round(score, 4)}
+        for doc_id, score in ranked if doc_id in docs_by_id
+    ]
+
 # PDF Generation Functions
-def generate_portfolio_pdf(user_data, projects_data, analytics_data):
+def generate_portfolio_pdf(user_data, projects_data, analytics_data, snapshot_time):
     """Generate PDF for user portfolio"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
@@ -363,17 +1549,15 @@ def generate_portfolio_pdf(user_data, projects_data, analytics_data):
             flowables.append(Paragraph(f"Type: {project['project_type'].title()}", styles['Normal']))
             flowables.append(Spacer(1, 15))
     
-    # Generate timestamp
     flowables.append(Spacer(1, 30))
-    timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-    flowables.append(Paragraph(f"Generated on {timestamp}", styles['Italic']))
+    flowables.append(Paragraph(f"Data as of {snapshot_time}", styles['Italic']))
     
     # Build PDF
     doc.build(flowables)
     buffer.seek(0)
     return buffer
 
-def generate_projects_pdf(projects_data, user_name):
+def generate_projects_pdf(projects_data, user_name, snapshot_time):
     """Generate PDF report for projects"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72,
@@ -447,22 +1631,76 @@ def generate_projects_pdf(projects_data, user_name):
         
         flowables.append(Spacer(1, 15))
     
-    # Generate timestamp
     flowables.append(Spacer(1, 30))
-    timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-    flowables.append(Paragraph(f"Generated on {timestamp}", styles['Italic']))
+    flowables.append(Paragraph(f"Data as of {snapshot_time}", styles['Italic']))
     
     # Build PDF
     doc.build(flowables)
     buffer.seek(0)
     return buffer
 
+def to_plain_data(value):
+    """Convert Mongo documents to picklable plain data with ISO date strings"""
+    if isinstance(value, dict):
+        return {k: to_plain_data(v) for k, v in value.items() if k not in ("_id", "password")}
+    if isinstance(value, (list, tuple)):
+        return [to_plain_data(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def render_pdf(export_type, user_data, projects_data, analytics_data, snapshot_time):
+    """Render an export to PDF bytes; runs inside a render pool worker.
+    
+    Cached renders are reused while the data is unchanged, so each PDF states
+    snapshot_time, when its data was read, rather than when a copy was served.
+    """
+    if export_type == "portfolio":
+        buffer = generate_portfolio_pdf(user_data, projects_data, analytics_data, snapshot_time)
+    else:
+        buffer = generate_projects_pdf(projects_data, user_data['name'], snapshot_time)
+    return buffer.getvalue()
+
+async def render_pdf_async(export_type, user_data, projects_data, analytics_data, snapshot_time):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        pdf_render_executor,
+        render_pdf,
+        export_type,
+        to_plain_data(user_data),
+        to_plain_data(projects_data),
+        to_plain_data(analytics_data),
+        snapshot_time
+    )
+
 # API Routes
 
 @app.get("/api/health")
 async def health_check():
     return {"status": "healthy", "message": "Advanced Portfolio & Project Management System API"}
 
+@app.get("/api/metrics")
+async def get_metrics(include_memory: bool = False):
+    return {
+        "password_hashing": {
+            **password_hash_stats,
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE,
+            "bcrypt_rounds": BCRYPT_ROUNDS
+        },
+        "user_cache": user_cache.stats(),
+        "analytics": analytics_service.stats(),
+        "mongo_pool": mongo_pool_listener.stats(),
+        "read_routing": read_routing_summary(),
+        "export_cache": {
+            **export_cache_stats,
+            "hit_rate": hit_rate(export_cache_stats["hits"], export_cache_stats["misses"]),
+            "max_bytes": EXPORT_CACHE_MAX_BYTES,
+            "max_age_seconds": EXPORT_CACHE_MAX_AGE_SECONDS
+        },
+        "search_index": search_index.stats(include_memory)
+    }
+
 # Authentication Endpoints
 @app.post("/api/auth/register", response_model=Token)
 async def register(user: UserRegister):
@@ -474,7 +1712,7 @@ async def register(user: UserRegister):
     # Create new user
     user_id = generate_id()
     now = datetime.utcnow()
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     
     user_doc = {
         "id": user_id,
@@ -497,8 +1735,8 @@ async def register(user: UserRegister):
         data={"sub": user_id}, expires_delta=access_token_expires
     )
     
-    # Remove password from response
-    user_response = {k: v for k, v in user_doc.items() if k != "password"}
+    # Remove password and the ObjectId insert_one added from response
+    user_response = {k: v for k, v in user_doc.items() if k not in ("password", "_id")}
     
     return {
         "access_token": access_token,
@@ -506,16 +1744,32 @@ async def register(user: UserRegister):
         "user": user_response
     }
 
+async def rehash_password(user_id: str, old_hash: str, password: str):
+    """Best-effort upgrade of a verified password's hash; skipped when the pool is busy"""
+    try:
+        new_hash = await hash_password_async(password)
+    except HTTPException:
+        return
+    # Only replace the hash that was verified, not a password changed meanwhile
+    result = await db.users.update_one({"id": user_id, "password": old_hash}, {"$set": {"password": new_hash}})
+    if result.modified_count:
+        user_cache.invalidate(user_id)
+        password_hash_stats["rehashed"] += 1
+
 @app.post("/api/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     user = await get_user_by_email(user_credentials.email)
-    if not user or not verify_password(user_credentials.password, user["password"]):
+    if not user or not user.get("password") or not await verify_password_async(user_credentials.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently upgrade hashes stored with an older cost factor
+    if password_needs_rehash(user["password"]):
+        spawn_background_task(rehash_password(user["id"], user["password"], user_credentials.password))
+    
     access_token_expires = timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["id"]}, expires_delta=access_token_expires
@@ -562,9 +1816,25 @@ async def create_user(user: UserCreate, current_user: dict = Depends(get_current
     return UserResponse(**{k: v for k, v in user_doc.items() if k != "password"})
 
 @app.get("/api/users", response_model=List[UserResponse])
-async def get_users(skip: int = 0, limit: int = 50, current_user: dict = Depends(get_current_user)):
-    cursor = db.users.find().skip(skip).limit(limit)
-    users = await cursor.to_list(length=limit)
+async def get_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,  # "summary" or comma separated field names
+    current_user: dict = Depends(get_current_user)
+):
+    limit = clamp_page_size(limit)
+    projection = resolve_projection(fields, UserResponse, UserSummary)
+    query = apply_keyset_cursor({}, after)
+    
+    cursor = db.users.find(query, projection).sort(KEYSET_SORT)
+    if not after:
+        cursor = cursor.skip(skip)
+    users = await cursor.limit(limit).to_list(length=limit)
+    set_next_cursor(response, users, limit)
+    if projection:
+        return projected_response(users, fields, UserSummary, response)
     return [UserResponse(**{k: v for k, v in user.items() if k != "password"}) for user in users]
 
 @app.get("/api/users/{user_id}", response_model=UserResponse)
@@ -580,8 +1850,6 @@ async def update_user(user_id: str, user_update: UserCreate, current_user: dict
         # In production, you'd implement proper authorization
         pass
     
-    await get_user_by_id(user_id)  # Check if user exists
-    
     update_doc = {
         "name": user_update.name,
         "email": user_update.email,
@@ -592,9 +1860,19 @@ async def update_user(user_id: str, user_update: UserCreate, current_user: dict
         "updated_at": datetime.utcnow()
     }
     
-    await db.users.update_one({"id": user_id}, {"$set": update_doc})
-    updated_user = await get_user_by_id(user_id)
-    return UserResponse(**{k: v for k, v in updated_user.items() if k != "password"})
+    try:
+        updated_user = await db.users.find_one_and_update(
+            {"id": user_id},
+            {"$set": update_doc},
+            projection={"_id": 0, "password": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(user_id)
+    return UserResponse(**updated_user)
 
 # Project Management Endpoints
 @app.post("/api/projects", response_model=ProjectResponse)
@@ -623,37 +1901,70 @@ async def create_project(project: ProjectCreate, current_user: dict = Depends(ge
     }
     
     await db.projects.insert_one(project_doc)
+    await increment_user_stats(user_id, project_stats_increments(project_doc, 1))
+    search_index.index_project(project_doc)
     return ProjectResponse(**project_doc)
 
 @app.get("/api/projects", response_model=List[ProjectResponse])
 async def get_projects(
+    response: Response,
     user_id: Optional[str] = None,
     status: Optional[str] = None,
     project_type: Optional[str] = None,
     search: Optional[str] = None,
+    search_mode: str = "text",  # text, regex
     skip: int = 0,
     limit: int = 50,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,  # "summary" or comma separated field names
     current_user: dict = Depends(get_current_user)
 ):
+    validate_search_mode(search_mode, ("text", "regex"))
+    limit = clamp_page_size(limit)
+    projection = resolve_projection(fields, ProjectResponse, ProjectSummary)
+    
     # If no user_id specified, use current user's projects
     if not user_id:
         user_id = current_user["id"]
     
-    query = {"user_id": user_id}
+    query = {"user_id": user_id, **LIVE_PROJECT}
     if status:
         query["status"] = status
     if project_type:
         query["project_type"] = project_type
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"technologies": {"$in": [{"$regex": search, "$options": "i"}]}},
-            {"tags": {"$in": [{"$regex": search, "$options": "i"}]}}
-        ]
     
-    cursor = db.projects.find(query).skip(skip).limit(limit).sort("created_at", -1)
-    projects = await cursor.to_list(length=limit)
+    if search and search_mode == "text":
+        # Relevance ordering has no stable keyset, so text search pages with skip
+        if after:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported with text search")
+        try:
+            cursor = db.projects.find(
+                {**query, "$text": {"$search": search}},
+                {**(projection or {}), "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"}), ("created_at", -1)]).skip(skip).limit(limit)
+            projects = await cursor.to_list(length=limit)
+            if projection:
+                return projected_response(projects, fields, ProjectSummary, response)
+            if FAST_JSON_RESPONSES:
+                return orjson_response(trusted_rows(projects, ProjectResponse), response)
+            return [ProjectResponse(**project) for project in projects]
+        except OperationFailure:
+            # Text index not built (yet); fall back to regex matching
+            pass
+    
+    if search:
+        query.update(regex_search_clause(search, PROJECT_SEARCH_FIELDS))
+    apply_keyset_cursor(query, after)
+    
+    cursor = db.projects.find(query, projection).sort(KEYSET_SORT)
+    if not after:
+        cursor = cursor.skip(skip)
+    projects = await cursor.limit(limit).to_list(length=limit)
+    set_next_cursor(response, projects, limit)
+    if projection:
+        return projected_response(projects, fields, ProjectSummary, response)
+    if FAST_JSON_RESPONSES:
+        return orjson_response(trusted_rows(projects, ProjectResponse), response)
     return [ProjectResponse(**project) for project in projects]
 
 @app.get("/api/projects/{project_id}", response_model=ProjectResponse)
@@ -666,11 +1977,6 @@ async def get_project(project_id: str, current_user: dict = Depends(get_current_
 
 @app.put("/api/projects/{project_id}", response_model=ProjectResponse)
 async def update_project(project_id: str, project_update: ProjectCreate, current_user: dict = Depends(get_current_user)):
-    project = await get_project_by_id(project_id)
-    # Ensure user can only update their own projects
-    if project["user_id"] != current_user["id"]:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     update_doc = {
         "title": project_update.title,
         "description": project_update.description,
@@ -684,29 +1990,163 @@ async def update_project(project_id: str, project_update: ProjectCreate, current
         "updated_at": datetime.utcnow()
     }
     
-    await db.projects.update_one({"id": project_id}, {"$set": update_doc})
-    updated_project = await get_project_by_id(project_id)
+    # Ownership is part of the filter; the previous version is returned because
+    # the stats rollup needs the old status and type
+    project = await db.projects.find_one_and_update(
+        {"id": project_id, "user_id": current_user["id"], **LIVE_PROJECT},
+        {"$set": update_doc},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not project:
+        await raise_not_found_or_denied(db.projects, {"id": project_id, **LIVE_PROJECT}, "Project not found")
+    updated_project = {**project, **update_doc}
+    
+    # Status and type transitions move counters between buckets
+    increments = {}
+    for field in ("status", "project_type"):
+        if project[field] != updated_project[field]:
+            bucket = "by_status" if field == "status" else "by_type"
+            increments[f"projects.{bucket}.{stats_key(project[field])}"] = -1
+            increments[f"projects.{bucket}.{stats_key(updated_project[field])}"] = 1
+    await increment_user_stats(project["user_id"], increments)
+    search_index.index_project(updated_project)
+    
     return ProjectResponse(**updated_project)
 
 @app.delete("/api/projects/{project_id}")
 async def delete_project(project_id: str, current_user: dict = Depends(get_current_user)):
-    project = await get_project_by_id(project_id)
-    # Ensure user can only delete their own projects
-    if project["user_id"] != current_user["id"]:
+    # Soft delete first: the project disappears from every read immediately
+    project = await db.projects.find_one_and_update(
+        {"id": project_id, "user_id": current_user["id"], **LIVE_PROJECT},
+        {"$set": {"deleted_at": datetime.utcnow()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not project:
+        await raise_not_found_or_denied(db.projects, {"id": project_id, **LIVE_PROJECT}, "Project not found")
+    search_index.remove_project(project_id)
+    
+    deletion = await record_project_deletion(project)
+    await increment_user_stats(project["user_id"], {
+        **project_stats_increments(project, -1),
+        "tasks.total": -deletion["tasks_total"],
+        "tasks.completed": -deletion["tasks_completed"]
+    }, project_id=project_id, purge_started=True)
+    
+    # Tasks and uploads are purged in the background
+    spawn_background_task(purge_project(project_id))
+    
+    return {
+        "message": "Project deleted; associated tasks and files are being purged",
+        "deletion": project_deletion_response(deletion)
+    }
+
+@app.get("/api/projects/{project_id}/deletion")
+async def get_project_deletion(project_id: str, current_user: dict = Depends(get_current_user)):
+    """Progress of a deleted project's background purge"""
+    deletion = await db.project_deletions.find_one({"project_id": project_id})
+    if not deletion:
+        raise HTTPException(status_code=404, detail="Project deletion not found")
+    if deletion["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Access denied")
+    return project_deletion_response(deletion)
+
+# Cascading project deletion
+# A deleted project's tasks are removed in batches of PROJECT_PURGE_BATCH_SIZE
+# with a pause between batches, so large projects never hold one long-running
+# delete; progress is kept in project_deletions. Purges interrupted by a
+# restart resume at startup.
+PROJECT_PURGE_BATCH_SIZE = int(os.getenv("PROJECT_PURGE_BATCH_SIZE", 1000))
+PROJECT_PURGE_BATCH_DELAY_MS = int(os.getenv("PROJECT_PURGE_BATCH_DELAY_MS", 50))
+
+def project_deletion_response(deletion: dict):
+    return {
+        "project_id": deletion["project_id"],
+        "status": deletion["status"],
+        "tasks_total": deletion["tasks_total"],
+        "tasks_deleted": deletion["tasks_deleted"],
+        "files_total": deletion["files_total"],
+        "files_released": deletion["files_released"],
+        "created_at": deletion["created_at"],
+        "updated_at": deletion["updated_at"],
+        "completed_at": deletion.get("completed_at")
+    }
+
+async def record_project_deletion(project: dict):
+    """Create the progress document for a soft-deleted project (idempotent)"""
+    now = datetime.utcnow()
+    return await db.project_deletions.find_one_and_update(
+        {"project_id": project["id"]},
+        {"$setOnInsert": {
+            "project_id": project["id"],
+            "user_id": project["user_id"],
+            "status": "pending",
+            "tasks_total": await db.tasks.count_documents({"project_id": project["id"]}),
+            "tasks_completed": await db.tasks.count_documents({"project_id": project["id"], "status": "completed"}),
+            "tasks_deleted": 0,
+            "files_total": len(project.get("files", [])),
+            "files_released": False,
+            "created_at": now,
+            "updated_at": now
+        }},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+async def purge_project(project_id: str):
+    await db.project_deletions.update_one(
+        {"project_id": project_id},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}}
+    )
     
-    # Delete associated tasks
-    await db.tasks.delete_many({"project_id": project_id})
+    while True:
+        batch = [
+            task["id"] async for task in
+            db.tasks.find({"project_id": project_id}, {"_id": 0, "id": 1}).limit(PROJECT_PURGE_BATCH_SIZE)
+        ]
+        if not batch:
+            break
+        result = await db.tasks.delete_many({"id": {"$in": batch}, "project_id": project_id})
+        await db.project_deletions.update_one(
+            {"project_id": project_id},
+            {"$inc": {"tasks_deleted": result.deleted_count}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        await asyncio.sleep(PROJECT_PURGE_BATCH_DELAY_MS / 1000)
     
-    # Delete the project
-    await db.projects.delete_one({"id": project_id})
+    # Claim the file release before doing it, so a resumed purge never drops
+    # references twice (a crash in between leaks blobs rather than losing them)
+    claimed = await db.project_deletions.find_one_and_update(
+        {"project_id": project_id, "files_released": False},
+        {"$set": {"files_released": True, "updated_at": datetime.utcnow()}}
+    )
+    if claimed:
+        project = await db.projects.find_one({"id": project_id}, {"files": 1})
+        if project:
+            await release_upload_blobs(project.get("files", []))
     
-    return {"message": "Project and associated tasks deleted successfully"}
+    await db.projects.delete_one({"id": project_id, "deleted_at": {"$ne": None}})
+    now = datetime.utcnow()
+    deletion = await db.project_deletions.find_one_and_update(
+        {"project_id": project_id},
+        {"$set": {"status": "completed", "completed_at": now, "updated_at": now}},
+        projection={"_id": 0, "user_id": 1}
+    )
+    if deletion:
+        # No tasks are left to guard against
+        await db.user_stats.update_one({"user_id": deletion["user_id"]}, {"$pull": {"purging_projects": project_id}})
+
+async def recover_project_deletions():
+    """Resume purges for projects still marked deleted after a restart"""
+    async for project in db.projects.find({"deleted_at": {"$ne": None}}, {"_id": 0, "id": 1, "user_id": 1, "files": 1}):
+        await record_project_deletion(project)
+        spawn_background_task(purge_project(project["id"]))
 
 # Task Management Endpoints
 @app.post("/api/projects/{project_id}/tasks", response_model=TaskResponse)
 async def create_task(project_id: str, task: TaskCreate):
-    await get_project_by_id(project_id)  # Validate project exists
+    project = await get_project_by_id(project_id)  # Validate project exists
     
     task_id = generate_id()
     now = datetime.utcnow()
@@ -714,6 +2154,7 @@ async def create_task(project_id: str, task: TaskCreate):
     task_doc = {
         "id": task_id,
         "project_id": project_id,
+        "user_id": project["user_id"],  # Denormalized owner for user-wide task queries
         "title": task.title,
         "description": task.description,
         "status": task.status,
@@ -726,26 +2167,39 @@ async def create_task(project_id: str, task: TaskCreate):
     }
     
     await db.tasks.insert_one(task_doc)
+    await increment_user_stats(project["user_id"], {
+        "tasks.total": 1,
+        "tasks.completed": 1 if task.status == "completed" else 0
+    }, project_id=project_id)
+    search_index.index_task(task_doc)
     return TaskResponse(**task_doc)
 
 @app.get("/api/projects/{project_id}/tasks", response_model=List[TaskResponse])
-async def get_project_tasks(project_id: str, status: Optional[str] = None):
+async def get_project_tasks(
+    project_id: str,
+    response: Response,
+    status: Optional[str] = None,
+    limit: int = MAX_PAGE_SIZE,
+    after: Optional[str] = None
+):
     await get_project_by_id(project_id)  # Validate project exists
+    limit = clamp_page_size(limit)
     
     query = {"project_id": project_id}
     if status:
         query["status"] = status
+    apply_keyset_cursor(query, after)
     
-    cursor = db.tasks.find(query).sort("created_at", -1)
-    tasks = await cursor.to_list(length=None)
+    cursor = db.tasks.find(query).sort(KEYSET_SORT).limit(limit)
+    tasks = await cursor.to_list(length=limit)
+    set_next_cursor(response, tasks, limit)
+    if FAST_JSON_RESPONSES:
+        return orjson_response(trusted_rows(tasks, TaskResponse), response)
     return [TaskResponse(**task) for task in tasks]
 
 @app.put("/api/tasks/{task_id}", response_model=TaskResponse)
 async def update_task(task_id: str, task_update: TaskCreate):
-    task = await db.tasks.find_one({"id": task_id})
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
+    now = datetime.utcnow()
     update_doc = {
         "title": task_update.title,
         "description": task_update.description,
@@ -753,119 +2207,428 @@ async def update_task(task_id: str, task_update: TaskCreate):
         "priority": task_update.priority,
         "due_date": task_update.due_date,
         "estimated_hours": task_update.estimated_hours,
-        "updated_at": datetime.utcnow()
+        "updated_at": now
     }
     
-    # Set completed_at if status is completed
-    if task_update.status == "completed" and task["status"] != "completed":
-        update_doc["completed_at"] = datetime.utcnow()
-    elif task_update.status != "completed":
-        update_doc["completed_at"] = None
+    # Set completed_at if status is completed. The update pipeline compares
+    # against the stored status, so the transition is decided in the same write.
+    stage = {field: {"$literal": value} for field, value in update_doc.items()}
+    if task_update.status == "completed":
+        stage["completed_at"] = {"$cond": [{"$eq": ["$status", "completed"]}, "$completed_at", now]}
+    else:
+        stage["completed_at"] = None
+    
+    task = await db.tasks.find_one_and_update(
+        {"id": task_id},
+        [{"$set": stage}],
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    updated_task = {**task, **update_doc, **completion_update(task["status"], task_update.status, now)}
+    
+    was_completed = task["status"] == "completed"
+    if was_completed != (task_update.status == "completed") and task.get("user_id"):
+        await increment_user_stats(
+            task["user_id"], {"tasks.completed": -1 if was_completed else 1}, project_id=task["project_id"]
+        )
+    search_index.index_task(updated_task)
     
-    await db.tasks.update_one({"id": task_id}, {"$set": update_doc})
-    updated_task = await db.tasks.find_one({"id": task_id})
     return TaskResponse(**updated_task)
 
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str):
-    task = await db.tasks.find_one({"id": task_id})
+    # Only the request that actually removed the task adjusts the rollup
+    task = await db.tasks.find_one_and_delete({"id": task_id}, projection={"_id": 0})
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    search_index.remove_task(task_id)
+    
+    if task.get("user_id"):
+        await increment_user_stats(task["user_id"], {
+            "tasks.total": -1,
+            "tasks.completed": -1 if task["status"] == "completed" else 0
+        }, project_id=task["project_id"])
     
-    await db.tasks.delete_one({"id": task_id})
     return {"message": "Task deleted successfully"}
 
-# File Upload Endpoints
-@app.post("/api/projects/{project_id}/upload")
-async def upload_file(project_id: str, file: UploadFile = File(...)):
-    await get_project_by_id(project_id)  # Validate project exists
-    
-    # Validate file size
-    max_size = int(os.getenv("MAX_FILE_SIZE", 10485760))  # 10MB default
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
+# Bulk task operations
+# Each batch validates the project once and is applied with a single
+# insert_many/bulk_write; invalid or missing items are reported per index
+# instead of failing the whole batch
+MAX_BULK_TASKS = int(os.getenv("MAX_BULK_TASKS", 5000))
+
+def check_bulk_size(items: list):
+    if not items:
+        raise HTTPException(status_code=400, detail="No tasks given")
+    if len(items) > MAX_BULK_TASKS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_TASKS} tasks per request")
+
+def bulk_write_failures(error: BulkWriteError) -> Dict[int, str]:
+    return {failure["index"]: failure["errmsg"] for failure in error.details.get("writeErrors", [])}
+
+def completion_update(old_status: Optional[str], new_status: str, now: datetime) -> dict:
+    """completed_at changes only when a task moves into or out of completed"""
+    if new_status == "completed" and old_status != "completed":
+        return {"completed_at": now}
+    if new_status != "completed":
+        return {"completed_at": None}
+    return {}
+
+@app.post("/api/projects/{project_id}/tasks/bulk")
+async def bulk_create_tasks(project_id: str, tasks: List[Dict[str, Any]], current_user: dict = Depends(get_current_user)):
+    check_bulk_size(tasks)
+    project = await get_project_by_id(project_id)  # Validate project exists once
+    if project["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    if file_size > max_size:
-        raise HTTPException(status_code=413, detail="File too large")
+    now = datetime.utcnow()
+    errors = []
+    task_docs = []
+    positions = []  # Request index of each task_doc
+    for index, item in enumerate(tasks):
+        try:
+            task = TaskCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append({"index": index, "detail": e.errors(include_url=False, include_context=False)})
+            continue
+        task_docs.append({
+            "id": generate_id(),
+            "project_id": project_id,
+            "user_id": project["user_id"],
+            "title": task.title,
+            "description": task.description,
+            "status": task.status,
+            "priority": task.priority,
+            "due_date": task.due_date,
+            "estimated_hours": task.estimated_hours,
+            **completion_update(None, task.status, now),
+            "created_at": now,
+            "updated_at": now
+        })
+        positions.append(index)
+    
+    failed = {}
+    if task_docs:
+        try:
+            await db.tasks.insert_many(task_docs, ordered=False)
+        except BulkWriteError as e:
+            failed = bulk_write_failures(e)
+    errors.extend({"index": positions[i], "detail": message} for i, message in failed.items())
+    created = [task_doc for i, task_doc in enumerate(task_docs) if i not in failed]
+    
+    await increment_user_stats(project["user_id"], {
+        "tasks.total": len(created),
+        "tasks.completed": sum(1 for task_doc in created if task_doc["status"] == "completed")
+    }, project_id=project_id)
+    for task_doc in created:
+        search_index.index_task(task_doc)
     
-    # Generate unique filename
-    file_extension = Path(file.filename).suffix
-    unique_filename = f"{project_id}_{generate_id()}{file_extension}"
-    file_path = upload_dir / unique_filename
+    return {
+        "created": [TaskResponse(**task_doc) for task_doc in created],
+        "errors": sorted(errors, key=lambda error: error["index"])
+    }
+
+@app.put("/api/projects/{project_id}/tasks/bulk")
+async def bulk_update_tasks(project_id: str, updates: List[Dict[str, Any]], current_user: dict = Depends(get_current_user)):
+    """Partial updates: only the fields present in each item are changed"""
+    check_bulk_size(updates)
+    project = await get_project_by_id(project_id)
+    if project["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    # Save file
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(content)
+    errors = []
+    parsed = []
+    for index, item in enumerate(updates):
+        try:
+            parsed.append((index, TaskBulkUpdate.model_validate(item)))
+        except ValidationError as e:
+            errors.append({"index": index, "detail": e.errors(include_url=False, include_context=False)})
+    
+    existing = {
+        task["id"]: task async for task in db.tasks.find(
+            {"id": {"$in": [update.id for _, update in parsed]}, "project_id": project_id}, {"_id": 0}
+        )
+    }
     
-    # Update project with file reference
-    await db.projects.update_one(
-        {"id": project_id},
-        {"$push": {"files": unique_filename}}
-    )
+    now = datetime.utcnow()
+    # Writes that change status are conditioned on the status they were
+    # computed from, so an overlapping update makes them miss instead of
+    # applying a stale completion delta. They are grouped by that delta:
+    # each group's matched count is exactly what the rollup must apply.
+    groups = defaultdict(list)  # completed delta -> [(index, operation, update_doc, new task)]
+    seen = set()
+    for index, update in parsed:
+        task = existing.get(update.id)
+        if task is None:
+            errors.append({"index": index, "detail": "Task not found"})
+            continue
+        if update.id in seen:
+            errors.append({"index": index, "detail": "Task updated more than once in this request"})
+            continue
+        seen.add(update.id)
+        
+        update_doc = {field: getattr(update, field) for field in update.model_fields_set if field != "id"}
+        nulls = [field for field in ("title", "status", "priority") if field in update_doc and update_doc[field] is None]
+        if nulls:
+            errors.append({"index": index, "detail": f"{', '.join(nulls)} cannot be null"})
+            continue
+        update_doc["updated_at"] = now
+        query = {"id": update.id, "project_id": project_id}
+        delta = 0
+        if "status" in update_doc:
+            update_doc.update(completion_update(task["status"], update_doc["status"], now))
+            query["status"] = task["status"]
+            delta = (update_doc["status"] == "completed") - (task["status"] == "completed")
+        
+        groups[delta].append((index, UpdateOne(query, {"$set": update_doc}), update_doc, {**task, **update_doc}))
+    
+    async def write_group(entries):
+        try:
+            result = await db.tasks.bulk_write([operation for _, operation, _, _ in entries], ordered=False)
+            return result.matched_count, {}
+        except BulkWriteError as e:
+            return e.details.get("nMatched", 0), bulk_write_failures(e)
+    
+    async def drop_conflicts(entries):
+        """Keep the entries whose values are stored; the rest lost to a concurrent update"""
+        stored = {
+            task["id"]: task async for task in db.tasks.find(
+                {"id": {"$in": [new["id"] for _, _, _, new in entries]}, "project_id": project_id}, {"_id": 0}
+            )
+        }
+        kept = []
+        for entry in entries:
+            index, _, update_doc, new = entry
+            fields = [field for field in update_doc if field not in ("updated_at", "completed_at")]
+            current = stored.get(new["id"])
+            if current is not None and all(current.get(field) == new[field] for field in fields):
+                kept.append(entry)
+            else:
+                errors.append({"index": index, "detail": "Task changed during the update; reload and retry"})
+        return kept
+    
+    results = await asyncio.gather(*(write_group(entries) for entries in groups.values()))
+    completed_delta = 0
+    updated = []
+    for (delta, entries), (matched, failed) in zip(groups.items(), results):
+        completed_delta += delta * matched
+        errors.extend({"index": entries[i][0], "detail": message} for i, message in failed.items())
+        written = [entry for i, entry in enumerate(entries) if i not in failed]
+        if matched < len(written):
+            written = await drop_conflicts(written)
+        updated.extend(written)
+    
+    await increment_user_stats(project["user_id"], {"tasks.completed": completed_delta}, project_id=project_id)
+    for _, _, _, task in updated:
+        search_index.index_task(task)
     
-    return {"filename": unique_filename, "message": "File uploaded successfully"}
+    return {
+        "updated": [TaskResponse(**task) for _, _, _, task in sorted(updated, key=lambda entry: entry[0])],
+        "errors": sorted(errors, key=lambda error: error["index"])
+    }
 
-# Analytics Endpoints
-@app.get("/api/analytics/dashboard")
-async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    query = {"user_id": user_id}
-    
-    # Project statistics
-    total_projects = await db.projects.count_documents(query)
-    completed_projects = await db.projects.count_documents({**query, "status": "completed"})
-    in_progress_projects = await db.projects.count_documents({**query, "status": "in-progress"})
+@app.post("/api/projects/{project_id}/tasks/bulk-delete")
+async def bulk_delete_tasks(project_id: str, request: TaskBulkDelete, current_user: dict = Depends(get_current_user)):
+    check_bulk_size(request.task_ids)
+    project = await get_project_by_id(project_id)
+    if project["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    # Task statistics
-    user_projects = await db.projects.find({"user_id": user_id}, {"id": 1}).to_list(length=None)
-    project_ids = [p["id"] for p in user_projects]
+    tasks = {
+        task["id"]: task async for task in db.tasks.find(
+            {"id": {"$in": request.task_ids}, "project_id": project_id}, {"_id": 0, "id": 1, "status": 1}
+        )
+    }
+    errors = [
+        {"index": index, "detail": "Task not found"}
+        for index, task_id in enumerate(request.task_ids) if task_id not in tasks
+    ]
     
-    task_query = {}
-    if project_ids:
-        task_query["project_id"] = {"$in": project_ids}
+    # Only the tasks this request actually removed adjust the rollup; splitting
+    # by status gives the completed count from the delete itself, not the read
+    completed_deleted = other_deleted = 0
+    if tasks:
+        query = {"id": {"$in": list(tasks)}, "project_id": project_id}
+        completed, other = await asyncio.gather(
+            db.tasks.delete_many({**query, "status": "completed"}),
+            db.tasks.delete_many({**query, "status": {"$ne": "completed"}})
+        )
+        completed_deleted, other_deleted = completed.deleted_count, other.deleted_count
+    for task_id in tasks:
+        search_index.remove_task(task_id)
     
-    total_tasks = await db.tasks.count_documents(task_query)
-    completed_tasks = await db.tasks.count_documents({**task_query, "status": "completed"})
+    await increment_user_stats(project["user_id"], {
+        "tasks.total": -(completed_deleted + other_deleted),
+        "tasks.completed": -completed_deleted
+    }, project_id=project_id)
     
-    # Project types distribution
+    return {"deleted": list(tasks), "errors": errors}
+
+# Upload blob storage
+# Uploads are stored once per distinct content in uploads/<sha256><ext>, with a
+# reference count in upload_blobs. Unreferenced blobs are removed by a periodic
+# sweep after a grace period. The sweep claims a blob (gc_pending) and moves its
+# file aside before dropping the record; an upload clears the claim and rewrites
+# the file, and the sweep restores the file when it loses its claim.
+UPLOAD_GC_INTERVAL_SECONDS = int(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", 600))
+UPLOAD_GC_GRACE_SECONDS = int(os.getenv("UPLOAD_GC_GRACE_SECONDS", 300))
+UPLOAD_BLOB_BACKFILL_BATCH = 500
+
+async def release_upload_blobs(filenames: List[str]):
+    """Drop one reference per occurrence of each blob filename"""
+    if not filenames:
+        return
+    now = datetime.utcnow()
+    await db.upload_blobs.bulk_write([
+        UpdateOne({"filename": filename}, {"$inc": {"ref_count": -count}, "$set": {"updated_at": now}})
+        for filename, count in Counter(filenames).items()
+    ], ordered=False)
+
+async def collect_orphaned_blobs():
+    cutoff = datetime.utcnow() - timedelta(seconds=UPLOAD_GC_GRACE_SECONDS)
+    removed = 0
+    while True:
+        # Claiming refreshes updated_at, so a claim left by a crashed sweep is
+        # picked up again after the grace period
+        token = generate_id()
+        blob = await db.upload_blobs.find_one_and_update(
+            {"ref_count": {"$lte": 0}, "updated_at": {"$lt": cutoff}},
+            {"$set": {"gc_pending": token, "updated_at": datetime.utcnow()}}
+        )
+        if not blob:
+            break
+        blob_path = upload_dir / blob["filename"]
+        claimed_path = upload_dir / f".gc_{token}"
+        try:
+            os.replace(blob_path, claimed_path)
+        except FileNotFoundError:
+            pass
+        result = await db.upload_blobs.delete_one({"filename": blob["filename"], "gc_pending": token})
+        if result.deleted_count:
+            if claimed_path.exists():
+                claimed_path.unlink()
+            removed += 1
+        elif claimed_path.exists():
+            # A new upload of the same content took the blob back
+            os.replace(claimed_path, blob_path)
+    return removed
+
+async def upload_gc_loop():
+    while True:
+        try:
+            removed = await collect_orphaned_blobs()
+            if removed:
+                print(f"Removed {removed} orphaned upload blobs")
+        except Exception as e:
+            print(f"Upload blob sweep failed: {e}")
+        await asyncio.sleep(UPLOAD_GC_INTERVAL_SECONDS)
+
+async def backfill_upload_blobs():
+    """Create upload_blobs records for files referenced before blobs were counted.
+    
+    Legacy uploads ({project_id}_{uuid}{ext}) and any referenced file without a
+    record get one whose ref_count is its number of references, including those
+    held by projects still being purged. Existing records are left alone.
+    """
+    created = 0
+    operations = []
+    now = datetime.utcnow()
     pipeline = [
-        {"$match": query},
-        {"$group": {"_id": "$project_type", "count": {"$sum": 1}}}
+        {"$unwind": "$files"},
+        {"$group": {"_id": "$files", "references": {"$sum": 1}}}
     ]
-    project_types = await db.projects.aggregate(pipeline).to_list(length=None)
+    async for entry in db.projects.aggregate(pipeline):
+        blob_path = upload_dir / entry["_id"]
+        operations.append(UpdateOne(
+            {"filename": entry["_id"]},
+            {"$setOnInsert": {
+                "ref_count": entry["references"],
+                "size": blob_path.stat().st_size if blob_path.exists() else None,
+                "created_at": now,
+                "updated_at": now
+            }},
+            upsert=True
+        ))
+        if len(operations) >= UPLOAD_BLOB_BACKFILL_BATCH:
+            created += (await db.upload_blobs.bulk_write(operations, ordered=False)).upserted_count
+            operations = []
+    if operations:
+        created += (await db.upload_blobs.bulk_write(operations, ordered=False)).upserted_count
+    print(f"Backfilled {created} upload blob records")
+    return created
+
+# File Upload Endpoints
+@app.post("/api/projects/{project_id}/upload")
+async def upload_file(project_id: str, file: UploadFile = File(...)):
+    await get_project_by_id(project_id)  # Validate project exists
     
-    # Activity over time (monthly breakdown for the past year)
-    year_ago = datetime.utcnow() - timedelta(days=365)
-    activity_pipeline = [
-        {"$match": {**query, "created_at": {"$gte": year_ago}}},
-        {"$group": {
-            "_id": {
-                "year": {"$year": "$created_at"},
-                "month": {"$month": "$created_at"}
+    # UploadSizeLimitMiddleware bounds the whole body; this is the exact file limit
+    max_size = MAX_FILE_SIZE
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=413, detail="File too large")
+    
+    temp_path = upload_dir / f".upload_{generate_id()}.tmp"
+    
+    # Stream to a temp file in fixed-size chunks, hashing as we go, so memory
+    # per upload is bounded by UPLOAD_CHUNK_SIZE
+    sha256 = hashlib.sha256()
+    file_size = 0
+    try:
+        async with aiofiles.open(temp_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise HTTPException(status_code=413, detail="File too large")
+                sha256.update(chunk)
+                await f.write(chunk)
+        
+        # Content addressed blob: identical files share one stored copy
+        blob_filename = f"{sha256.hexdigest()}{Path(file.filename).suffix.lower()}"
+        now = datetime.utcnow()
+        previous = await db.upload_blobs.find_one_and_update(
+            {"filename": blob_filename},
+            {
+                "$inc": {"ref_count": 1},
+                "$set": {"updated_at": now},
+                "$unset": {"gc_pending": ""},
+                "$setOnInsert": {"sha256": sha256.hexdigest(), "size": file_size, "created_at": now}
             },
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"_id.year": 1, "_id.month": 1}}
-    ]
-    monthly_activity = await db.projects.aggregate(activity_pipeline).to_list(length=None)
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        # Write the file unless an unclaimed record already guarantees it: the
+        # sweep may be moving a claimed blob aside right now
+        blob_path = upload_dir / blob_filename
+        if previous is None or previous.get("gc_pending") or not blob_path.exists():
+            os.replace(temp_path, blob_path)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    
+    # Update project with file reference
+    result = await db.projects.update_one(
+        {"id": project_id, **LIVE_PROJECT},
+        {"$push": {"files": blob_filename}}
+    )
+    if result.matched_count == 0:
+        # Deleted while uploading; its purge will not see this reference
+        await release_upload_blobs([blob_filename])
+        raise HTTPException(status_code=404, detail="Project not found")
     
     return {
-        "projects": {
-            "total": total_projects,
-            "completed": completed_projects,
-            "in_progress": in_progress_projects,
-            "completion_rate": round((completed_projects / total_projects * 100) if total_projects > 0 else 0, 1)
-        },
-        "tasks": {
-            "total": total_tasks,
-            "completed": completed_tasks,
-            "completion_rate": round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
-        },
-        "project_types": {pt["_id"]: pt["count"] for pt in project_types},
-        "monthly_activity": monthly_activity
+        "filename": blob_filename,
+        "size": file_size,
+        "sha256": sha256.hexdigest(),
+        "message": "File uploaded successfully"
     }
 
+# Analytics Endpoints
+@app.get("/api/analytics/dashboard")
+async def get_dashboard_analytics(current_user: dict = Depends(get_current_user)):
+    return await analytics_service.get(current_user["id"])
+
 # Enhanced Search Endpoint
 @app.get("/api/search")
 async def advanced_search(
@@ -874,10 +2637,18 @@ async def advanced_search(
     status: Optional[str] = None,
     project_type: Optional[str] = None,
     priority: Optional[str] = None,
+    mode: str = "memory",  # memory, text, regex
     limit: int = 50,
+    debug: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
     """Advanced search across projects, tasks, and users"""
+    validate_search_mode(mode)
+    
+    use_search_index = mode == "memory" and search_index.ready
+    if mode == "memory":
+        mode = "text"  # Mongo fallback while the index warms up, and for users
+    
     results = {
         "projects": [],
         "tasks": [],
@@ -886,158 +2657,298 @@ async def advanced_search(
     }
     
     user_id = current_user["id"]
+    subqueries = {}
     
     # Search projects
     if type in ["all", "projects"]:
-        project_query = {
-            "user_id": user_id,
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"description": {"$regex": query, "$options": "i"}},
-                {"technologies": {"$regex": query, "$options": "i"}},
-                {"tags": {"$regex": query, "$options": "i"}}
-            ]
-        }
-        
-        if status:
-            project_query["status"] = status
-        if project_type:
-            project_query["project_type"] = project_type
-        if priority:
-            project_query["priority"] = priority
-        
-        projects = await db.projects.find(project_query).limit(limit).to_list(length=limit)
-        results["projects"] = projects
+        project_filters = {"status": status, "project_type": project_type, "priority": priority}
+        if use_search_index:
+            ranked = search_index.search(user_id, "projects", query, limit, project_filters)
+            subqueries["projects"] = fetch_ranked("projects", ranked, user_id)
+        else:
+            project_query = {"user_id": user_id, **LIVE_PROJECT, **{k: v for k, v in project_filters.items() if v}}
+            subqueries["projects"] = search_collection(
+                "projects", project_query, query, PROJECT_SEARCH_FIELDS, limit, mode
+            )
     
     # Search tasks
     if type in ["all", "tasks"]:
-        # Get user's project IDs first
-        user_projects = await db.projects.find({"user_id": user_id}, {"id": 1}).to_list(length=None)
-        project_ids = [p["id"] for p in user_projects]
-        
-        if project_ids:
-            task_query = {
-                "project_id": {"$in": project_ids},
-                "$or": [
-                    {"title": {"$regex": query, "$options": "i"}},
-                    {"description": {"$regex": query, "$options": "i"}}
-                ]
-            }
-            
-            if status:
-                task_query["status"] = status
-            if priority:
-                task_query["priority"] = priority
-            
-            tasks = await db.tasks.find(task_query).limit(limit).to_list(length=limit)
-            results["tasks"] = tasks
+        task_filters = {"status": status, "priority": priority}
+        if use_search_index:
+            ranked = search_index.search(user_id, "tasks", query, limit, task_filters)
+            subqueries["tasks"] = fetch_ranked("tasks", ranked, user_id)
+        else:
+            task_filters = {k: v for k, v in task_filters.items() if v}
+            subqueries["tasks"] = search_user_tasks(user_id, task_filters, query, limit, mode)
     
     # Search users (public profiles only)
     if type in ["all", "users"]:
-        user_query = {
-            "$or": [
-                {"name": {"$regex": query, "$options": "i"}},
-                {"title": {"$regex": query, "$options": "i"}},
-                {"skills": {"$regex": query, "$options": "i"}}
-            ]
+        subqueries["users"] = search_collection(
+            "users", {}, query, USER_SEARCH_FIELDS, limit, mode, projection={"password": 0}
+        )
+    
+    # Subqueries are independent: run them concurrently, each with its own
+    # timeout so one slow collection cannot hold up the others
+    timings = {}
+    timed_out = []
+    
+    async def run_subquery(name, coro):
+        started = time.perf_counter()
+        try:
+            results[name] = await asyncio.wait_for(coro, SEARCH_SUBQUERY_TIMEOUT_MS / 1000)
+        except (asyncio.TimeoutError, ExecutionTimeout):
+            timed_out.append(name)
+        finally:
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+    
+    await asyncio.gather(*(run_subquery(name, coro) for name, coro in subqueries.items()))
+    
+    if timed_out:
+        results["timed_out"] = timed_out
+    if debug:
+        results["debug"] = {
+            "mode": "memory" if use_search_index else mode,
+            "timings_ms": timings,
+            "timeout_ms": SEARCH_SUBQUERY_TIMEOUT_MS
         }
-        
-        users = await db.users.find(user_query, {"password": 0}).limit(limit).to_list(length=limit)
-        results["users"] = users
     
     results["total"] = len(results["projects"]) + len(results["tasks"]) + len(results["users"])
     
     return results
 
 # PDF Export Endpoints
+EXPORT_TYPES = ("portfolio", "projects")
+
+# Rendered exports are content addressed: the filename embeds a hash of every
+# input that affects the PDF, so an unchanged export is served from disk
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+EXPORT_CACHE_MAX_AGE_SECONDS = int(os.getenv("EXPORT_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+export_cache_stats = {
+    "hits": 0,
+    "misses": 0,
+    "evicted_files": 0,
+    "evicted_bytes": 0
+}
+
+def export_cache_key(export_type, user_data, project_versions, analytics_data):
+    key_data = {
+        "export_type": export_type,
+        "user": {field: user_data.get(field) for field in ("name", "email", "title", "bio", "skills", "updated_at")},
+        "projects": sorted(project_versions),
+    }
+    if export_type == "portfolio":
+        # The portfolio summary table includes analytics totals
+        key_data["analytics"] = {"projects": analytics_data["projects"], "tasks": analytics_data["tasks"]}
+    return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def evict_export_cache():
+    """Delete exports past the max age, then the oldest until under the size cap"""
+    expire_before = time.time() - EXPORT_CACHE_MAX_AGE_SECONDS
+    files = []
+    for path in export_dir.glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    
+    total_bytes = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        if mtime >= expire_before and total_bytes <= EXPORT_CACHE_MAX_BYTES:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        total_bytes -= size
+        export_cache_stats["evicted_files"] += 1
+        export_cache_stats["evicted_bytes"] += size
+
+async def run_export(export_request: ExportRequest):
+    """Fetch, render and save an export; returns the saved filename"""
+    # Get user data
+    user_data = await get_user_by_id(export_request.user_id)
+    
+    # Get analytics data from the user's rollup document
+    analytics_data = await analytics_service.get(export_request.user_id)
+    
+    if export_request.export_type == "portfolio":
+        # Get completed projects for portfolio
+        projects_query = {
+            "user_id": export_request.user_id,
+            "status": "completed",
+            **LIVE_PROJECT
+        }
+    elif export_request.export_type == "projects":
+        # Get all or specific projects
+        projects_query = {"user_id": export_request.user_id, **LIVE_PROJECT}
+        if export_request.project_ids:
+            projects_query["id"] = {"$in": export_request.project_ids}
+    else:
+        raise HTTPException(status_code=400, detail="Invalid export type")
+    
+    # Only project versions are needed to decide whether a render is cached
+    project_versions = [
+        (p["id"], p.get("updated_at"))
+        async for p in read_db("export").projects.find(projects_query, {"id": 1, "updated_at": 1})
+    ]
+    cache_key = export_cache_key(export_request.export_type, user_data, project_versions, analytics_data)
+    filename = f"{export_request.export_type}_{user_data['name'].replace(' ', '_')}_{cache_key[:16]}.pdf"
+    file_path = export_dir / filename
+    
+    if file_path.exists():
+        export_cache_stats["hits"] += 1
+        file_path.touch()  # Keep recently served exports out of eviction
+        return filename
+    export_cache_stats["misses"] += 1
+    
+    snapshot_time = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    projects_data = await read_db("export").projects.find(projects_query).to_list(length=None)
+    
+    # Generate PDF in the render pool
+    pdf_bytes = await render_pdf_async(
+        export_request.export_type, user_data, projects_data, analytics_data, snapshot_time
+    )
+    
+    # Save PDF to exports directory, renaming into place so readers never see a partial file
+    temp_path = export_dir / f".{filename}.{generate_id()}.tmp"
+    async with aiofiles.open(temp_path, 'wb') as f:
+        await f.write(pdf_bytes)
+    os.replace(temp_path, file_path)
+    
+    spawn_background_task(asyncio.to_thread(evict_export_cache))
+    return filename
+
+# Export jobs
+# Background exports are stored in export_jobs and rendered by local worker
+# tasks. While a job is queued or running it carries an active_key, which has a
+# unique index, so repeated identical requests share one job.
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", 2))
+EXPORT_JOB_STALE_SECONDS = int(os.getenv("EXPORT_JOB_STALE_SECONDS", 600))
+export_job_queue = asyncio.Queue()
+
+def export_job_active_key(export_request: ExportRequest):
+    project_ids = ",".join(sorted(export_request.project_ids or []))
+    key = f"{export_request.user_id}:{export_request.export_type}:{project_ids}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def export_job_response(job: dict):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "export_type": job["export_type"],
+        "filename": job.get("filename"),
+        "download_url": job.get("download_url"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+async def enqueue_export_job(export_request: ExportRequest):
+    """Create a queued export job, or return the identical job already in flight"""
+    now = datetime.utcnow()
+    job = {
+        "id": generate_id(),
+        "user_id": export_request.user_id,
+        "export_type": export_request.export_type,
+        "request": export_request.model_dump(),
+        "active_key": export_job_active_key(export_request),
+        "status": "queued",
+        "filename": None,
+        "download_url": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    
+    try:
+        await db.export_jobs.insert_one(job)
+    except DuplicateKeyError:
+        existing = await db.export_jobs.find_one({"active_key": job["active_key"]})
+        if existing:
+            return existing
+        # The in-flight job finished between the insert and the lookup
+        await db.export_jobs.insert_one(job)
+    
+    export_job_queue.put_nowait(job["id"])
+    return job
+
+async def process_export_job(job_id: str):
+    # Claim the job atomically so only one worker renders it
+    job = await db.export_jobs.find_one_and_update(
+        {"id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not job:
+        return
+    
+    try:
+        filename = await run_export(ExportRequest(**job["request"]))
+        result = {"status": "done", "filename": filename, "download_url": f"/exports/{filename}"}
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        result = {"status": "failed", "error": f"Export failed: {error}"}
+    
+    await db.export_jobs.update_one(
+        {"id": job_id},
+        {"$set": {**result, "updated_at": datetime.utcnow()}, "$unset": {"active_key": ""}}
+    )
+
+async def export_job_worker():
+    while True:
+        job_id = await export_job_queue.get()
+        try:
+            await process_export_job(job_id)
+        except Exception as e:
+            print(f"Export job {job_id} crashed: {e}")
+        finally:
+            export_job_queue.task_done()
+
+async def recover_export_jobs():
+    """Requeue jobs left behind by a previous process"""
+    stale_before = datetime.utcnow() - timedelta(seconds=EXPORT_JOB_STALE_SECONDS)
+    await db.export_jobs.update_many(
+        {"status": "running", "updated_at": {"$lt": stale_before}},
+        {"$set": {"status": "queued", "updated_at": datetime.utcnow()}}
+    )
+    async for job in db.export_jobs.find({"status": "queued"}, {"id": 1}).sort("created_at", 1):
+        export_job_queue.put_nowait(job["id"])
+
 @app.post("/api/export/pdf")
-async def export_pdf(export_request: ExportRequest, current_user: dict = Depends(get_current_user)):
-    """Export user data as PDF"""
+async def export_pdf(export_request: ExportRequest, background: bool = False, current_user: dict = Depends(get_current_user)):
+    """Export user data as PDF, or queue an export job when background=true"""
+    # Ensure user can only export their own data
+    if export_request.user_id != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    if export_request.export_type not in EXPORT_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid export type")
+    
+    if background:
+        job = await enqueue_export_job(export_request)
+        return export_job_response(job)
+    
     try:
-        # Get user data
-        user_data = await get_user_by_id(export_request.user_id)
-        
-        # Ensure user can only export their own data
-        if export_request.user_id != current_user["id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
-        
-        # Get analytics data by calling the analytics function directly
-        user_id = current_user["id"]
-        query = {"user_id": user_id}
-        
-        # Project statistics
-        total_projects = await db.projects.count_documents(query)
-        completed_projects = await db.projects.count_documents({**query, "status": "completed"})
-        in_progress_projects = await db.projects.count_documents({**query, "status": "in-progress"})
-        
-        # Task statistics
-        user_projects = await db.projects.find({"user_id": user_id}, {"id": 1}).to_list(length=None)
-        project_ids = [p["id"] for p in user_projects]
-        
-        task_query = {}
-        if project_ids:
-            task_query["project_id"] = {"$in": project_ids}
-        
-        total_tasks = await db.tasks.count_documents(task_query)
-        completed_tasks = await db.tasks.count_documents({**task_query, "status": "completed"})
-        
-        analytics_data = {
-            "projects": {
-                "total": total_projects,
-                "completed": completed_projects,
-                "in_progress": in_progress_projects,
-                "completion_rate": round((completed_projects / total_projects * 100) if total_projects > 0 else 0, 1)
-            },
-            "tasks": {
-                "total": total_tasks,
-                "completed": completed_tasks,
-                "completion_rate": round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 1)
-            }
-        }
-        
-        if export_request.export_type == "portfolio":
-            # Get completed projects for portfolio
-            projects_data = await db.projects.find({
-                "user_id": export_request.user_id,
-                "status": "completed"
-            }).to_list(length=None)
-            
-            # Generate portfolio PDF
-            pdf_buffer = generate_portfolio_pdf(user_data, projects_data, analytics_data)
-            filename = f"portfolio_{user_data['name'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
-            
-        elif export_request.export_type == "projects":
-            # Get all or specific projects
-            if export_request.project_ids:
-                projects_data = await db.projects.find({
-                    "user_id": export_request.user_id,
-                    "id": {"$in": export_request.project_ids}
-                }).to_list(length=None)
-            else:
-                projects_data = await db.projects.find({
-                    "user_id": export_request.user_id
-                }).to_list(length=None)
-            
-            # Generate projects PDF
-            pdf_buffer = generate_projects_pdf(projects_data, user_data['name'])
-            filename = f"projects_{user_data['name'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
-            
-        else:
-            raise HTTPException(status_code=400, detail="Invalid export type")
-        
-        # Save PDF to exports directory
-        file_path = export_dir / filename
-        with open(file_path, 'wb') as f:
-            f.write(pdf_buffer.getvalue())
-        
-        return {
-            "message": "PDF exported successfully",
-            "filename": filename,
-            "download_url": f"/exports/{filename}"
-        }
-        
+        filename = await run_export(export_request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    
+    return {
+        "message": "PDF exported successfully",
+        "filename": filename,
+        "download_url": f"/exports/{filename}"
+    }
+
+@app.get("/api/export/jobs/{job_id}")
+async def get_export_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Poll the status of a background export job"""
+    job = await db.export_jobs.find_one({"id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["user_id"] != current_user["id"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return export_job_response(job)
 
 @app.get("/api/export/download/{filename}")
 async def download_export(filename: str):
@@ -1053,6 +2964,189 @@ async def download_export(filename: str):
         media_type='application/pdf'
     )
 
+# NDJSON portfolio export/import
+# One record per line: each project is followed by its tasks, and every record
+# carries a "type" of "project" or "task". Both directions stream through Mongo
+# cursors and fixed size batches, so memory use does not grow with the portfolio.
+NDJSON_BATCH_SIZE = int(os.getenv("NDJSON_BATCH_SIZE", 1000))
+NDJSON_CHUNK_BYTES = 64 * 1024
+NDJSON_MAX_ERRORS = 100
+NDJSON_MAX_LINE_BYTES = 1024 * 1024
+
+async def stream_portfolio_ndjson(user_id: str):
+    buffer = bytearray()
+    projects = read_db("export").projects.find({"user_id": user_id, **LIVE_PROJECT}, {"_id": 0}).sort(KEYSET_SORT).batch_size(NDJSON_BATCH_SIZE)
+    async for project in projects:
+        buffer += orjson.dumps({"type": "project", **trusted_rows([project], ProjectResponse)[0]}) + b"\n"
+        tasks = read_db("export").tasks.find({"project_id": project["id"]}, {"_id": 0}).sort(KEYSET_SORT).batch_size(NDJSON_BATCH_SIZE)
+        async for task in tasks:
+            buffer += orjson.dumps({"type": "task", **trusted_rows([task], TaskResponse)[0]}) + b"\n"
+            if len(buffer) >= NDJSON_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+        if len(buffer) >= NDJSON_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+async def ndjson_lines(request: Request):
+    """Yield (line_number, line) from a streamed request body.
+    
+    Lines longer than NDJSON_MAX_LINE_BYTES are discarded as they arrive
+    and yielded as None, so one oversized line cannot exhaust memory.
+    """
+    pending = bytearray()
+    oversized = False
+    line_number = 0
+    async for chunk in request.stream():
+        start = 0
+        # Only the new chunk is scanned for line breaks
+        while (end := chunk.find(b"\n", start)) != -1:
+            line_number += 1
+            if oversized or len(pending) + end - start > NDJSON_MAX_LINE_BYTES:
+                yield line_number, None
+            else:
+                pending += chunk[start:end]
+                if pending.strip():
+                    yield line_number, bytes(pending)
+            pending.clear()
+            oversized = False
+            start = end + 1
+        if not oversized:
+            pending += chunk[start:]
+            if len(pending) > NDJSON_MAX_LINE_BYTES:
+                oversized = True
+                pending.clear()
+    if oversized:
+        yield line_number + 1, None
+    elif pending.strip():
+        yield line_number + 1, bytes(pending)
+
+@app.get("/api/export/ndjson")
+async def export_ndjson(current_user: dict = Depends(get_current_user)):
+    """Stream the current user's projects and tasks as NDJSON"""
+    filename = f"portfolio_{current_user['id']}_{datetime.utcnow().strftime('%Y%m%d')}.ndjson"
+    return StreamingResponse(
+        stream_portfolio_ndjson(current_user["id"]),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/api/import/ndjson")
+async def import_ndjson(request: Request, current_user: dict = Depends(get_current_user)):
+    """Import an NDJSON portfolio export into the current user's account.
+    
+    Records get fresh ids; tasks are re-pointed at the imported copy of their
+    project. Uploaded files are not part of the export, so projects arrive
+    without file references.
+    """
+    user_id = current_user["id"]
+    project_ids = {}  # Exported project id -> imported project id
+    project_batch, task_batch = [], []  # (line_number, document)
+    failed_projects = set()  # Exported ids of projects that could not be stored
+    counts = {"projects": 0, "tasks": 0, "failed": 0}
+    errors = []
+    
+    def reject(line_number: int, detail):
+        counts["failed"] += 1
+        if len(errors) < NDJSON_MAX_ERRORS:
+            errors.append({"line": line_number, "detail": detail})
+    
+    async def insert_batch(collection, batch) -> list:
+        """Insert a batch, reject the rows Mongo refused and return the stored documents"""
+        failed = {}
+        try:
+            await db[collection].insert_many([doc for _, doc in batch], ordered=False)
+        except BulkWriteError as e:
+            failed = bulk_write_failures(e)
+        for i, message in failed.items():
+            reject(batch[i][0], message)
+        stored = [doc for i, (_, doc) in enumerate(batch) if i not in failed]
+        batch.clear()
+        return stored
+    
+    async def flush_projects():
+        if not project_batch:
+            return
+        refused = {doc["id"] for _, doc in project_batch}
+        for project_doc in await insert_batch("projects", project_batch):
+            search_index.index_project(project_doc)
+            refused.discard(project_doc["id"])
+            counts["projects"] += 1
+        if refused:
+            # Tasks of a refused project are rejected rather than orphaned
+            for exported_id, project_id in list(project_ids.items()):
+                if project_id in refused:
+                    del project_ids[exported_id]
+                    failed_projects.add(exported_id)
+            for line_number, task_doc in task_batch:
+                if task_doc["project_id"] in refused:
+                    reject(line_number, "Project was not imported")
+            task_batch[:] = [(n, doc) for n, doc in task_batch if doc["project_id"] not in refused]
+    
+    async def flush_tasks():
+        # Projects go first so every stored task has its project
+        await flush_projects()
+        if task_batch:
+            for task_doc in await insert_batch("tasks", task_batch):
+                search_index.index_task(task_doc)
+                counts["tasks"] += 1
+    
+    try:
+        async for line_number, line in ndjson_lines(request):
+            if line is None:
+                reject(line_number, f"Line exceeds {NDJSON_MAX_LINE_BYTES} bytes")
+                continue
+            try:
+                record = orjson.loads(line)
+                record_type = record.pop("type", None) if isinstance(record, dict) else None
+                if record_type == "project":
+                    project = ProjectResponse.model_validate(record)
+                elif record_type == "task":
+                    task = TaskResponse.model_validate(record)
+                else:
+                    reject(line_number, 'Expected an object with type "project" or "task"')
+                    continue
+            except orjson.JSONDecodeError as e:
+                reject(line_number, f"Invalid JSON: {e}")
+                continue
+            except ValidationError as e:
+                reject(line_number, e.errors(include_url=False, include_context=False))
+                continue
+            
+            if record_type == "project":
+                project_doc = {**project.model_dump(), "id": generate_id(), "user_id": user_id, "files": []}
+                project_ids[project.id] = project_doc["id"]
+                project_batch.append((line_number, project_doc))
+                if len(project_batch) >= NDJSON_BATCH_SIZE:
+                    await flush_projects()
+            elif task.project_id in failed_projects:
+                reject(line_number, "Project was not imported")
+            elif task.project_id not in project_ids:
+                reject(line_number, "Task does not follow its project")
+            else:
+                task_batch.append((line_number, {
+                    **task.model_dump(),
+                    "id": generate_id(),
+                    "project_id": project_ids[task.project_id],
+                    "user_id": user_id
+                }))
+                if len(task_batch) >= NDJSON_BATCH_SIZE:
+                    await flush_tasks()
+        await flush_tasks()
+    finally:
+        # Whatever was stored before a failure is counted in the rollup
+        if counts["projects"]:
+            await rebuild_user_stats(user_id)
+    
+    return {
+        "imported_projects": counts["projects"],
+        "imported_tasks": counts["tasks"],
+        "failed": counts["failed"],
+        "errors": errors
+    }
+
 # Demo data creation endpoint
 @app.post("/api/demo/create-users")
 async def create_demo_users():
@@ -1103,6 +3197,63 @@ async def create_demo_users():
     
     return {"message": f"Created {len(created_users)} demo users", "count": len(created_users)}
 
+# Keep references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+def log_background_task_failure(task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+
+def spawn_background_task(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(log_background_task_failure)
+    return task
+
+@app.on_event("startup")
+async def startup_event():
+    spawn_background_task(ensure_indexes())
+    for _ in range(EXPORT_JOB_WORKERS):
+        spawn_background_task(export_job_worker())
+    spawn_background_task(recover_export_jobs())
+    spawn_background_task(recover_project_deletions())
+    spawn_background_task(backfill_task_owners())
+    spawn_background_task(backfill_upload_blobs())
+    spawn_background_task(asyncio.to_thread(evict_export_cache))
+    spawn_background_task(upload_gc_loop())
+    if SEARCH_INDEX_ENABLED:
+        spawn_background_task(build_search_index())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    password_hash_executor.shutdown(wait=False)
+    pdf_render_executor.shutdown(wait=False)
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Advanced Portfolio & Project Management System API")
+    subparsers = parser.add_subparsers(dest="command")
+    indexes_parser = subparsers.add_parser("indexes", help="Print the index plan and its explain() verification")
+    indexes_parser.add_argument("--apply", action="store_true", help="Create missing indexes before verifying")
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Recompute user_stats analytics rollups from projects and tasks")
+    stats_parser.add_argument("--user-id", help="Only rebuild this user's rollup")
+    subparsers.add_parser("backfill-task-owners", help="Store each project's user_id on its existing tasks")
+    subparsers.add_parser("backfill-upload-blobs", help="Create reference-counted upload_blobs records for existing project files")
+    subparsers.add_parser("read-routing", help="Show which replica set member serves each operation's reads")
+    args = parser.parse_args()
+    
+    if args.command == "indexes":
+        asyncio.run(print_index_plan(apply=args.apply))
+    elif args.command == "rebuild-stats":
+        asyncio.run(rebuild_all_user_stats(args.user_id))
+    elif args.command == "backfill-task-owners":
+        asyncio.run(backfill_task_owners())
+    elif args.command == "backfill-upload-blobs":
+        asyncio.run(backfill_upload_blobs())
+    elif args.command == "read-routing":
+        asyncio.run(print_read_routing())
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
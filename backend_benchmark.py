@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Advanced Portfolio & Project Management System - Backend Performance Benchmarks
+Runs against a live API server seeded with the demo users
+"""
+
+import requests
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+class PortfolioAPIBenchmark:
+    def __init__(self, base_url: str = "http://localhost:8001", mongo_url: str = None):
+        self.base_url = base_url
+        self.mongo_url = mongo_url or os.getenv("MONGO_URL", "mongodb://localhost:27017/portfolio_db")
+        self.token = None
+        self.current_user = None
+        self.session = requests.Session()
+
+        # Demo credentials from DEMO_CREDENTIALS.md
+        self.demo_credentials = {
+            "email": "john.doe@demo.com",
+            "password": "demo123"
+        }
+
+        print(f"⏱️  Portfolio API Benchmark")
+        print(f"📍 Benchmarking against: {self.base_url}")
+        print("=" * 60)
+
+    def request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None):
+        """Make an authenticated request and return (status_code, elapsed_ms, json)"""
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        start = time.perf_counter()
+        response = self.session.request(
+            method, f"{self.base_url}/api/{endpoint}",
+            json=data, params=params, headers=headers, timeout=300
+        )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, elapsed_ms, body
+
+    def authenticate(self):
+        self.request('POST', 'demo/create-users')
+        status_code, _, body = self.request('POST', 'auth/login', self.demo_credentials)
+        if status_code != 200:
+            raise RuntimeError(f"Login failed: {body}")
+        self.token = body['access_token']
+        self.current_user = body['user']
+        print(f"🔐 Authenticated as {self.current_user['email']}")
+
+    def seed_projects(self, count: int):
+        """Ensure the benchmark user owns at least `count` projects"""
+        _, _, analytics = self.request('GET', 'analytics/dashboard')
+        missing = count - analytics['projects']['total']
+        for i in range(max(missing, 0)):
+            self.request('POST', 'projects', {
+                "title": f"Benchmark Project {i + 1}",
+                "description": "Seeded project used by the backend benchmarks. " * 4,
+                "technologies": ["Python", "FastAPI", "MongoDB"],
+                "status": "completed" if i % 2 else "in-progress",
+                "project_type": "software",
+                "priority": "medium",
+                "tags": ["benchmark"]
+            })
+        print(f"🌱 Seeded {max(missing, 0)} projects ({count} total)")
+
+    def list_project_ids(self, count: int) -> List[str]:
+        """Ids of up to `count` of the benchmark user's projects, newest first"""
+        project_ids = []
+        after = None
+        while len(project_ids) < count:
+            response = self.session.get(
+                f"{self.base_url}/api/projects",
+                params={"limit": min(count - len(project_ids), 100), "fields": "id", **({"after": after} if after else {})},
+                headers={'Authorization': f'Bearer {self.token}'}
+            )
+            project_ids.extend(project['id'] for project in response.json())
+            after = response.headers.get('X-Next-Cursor')
+            if not after:
+                break
+        return project_ids
+
+    @staticmethod
+    def summarize(name: str, samples: List[float]):
+        samples = sorted(samples)
+        if not samples:
+            print(f"  {name}: no samples")
+            return
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"  {name}: n={len(samples)} "
+              f"p50={statistics.median(samples):.1f}ms "
+              f"p99={p99:.1f}ms max={samples[-1]:.1f}ms")
+
+    def probe_latency(self, stop: threading.Event, endpoint: str = 'health'):
+        """Hit a cheap endpoint in a loop until `stop` is set"""
+        samples = []
+        while not stop.is_set():
+            _, elapsed_ms, _ = self.request('GET', endpoint)
+            samples.append(elapsed_ms)
+        return samples
+
+    def benchmark_export_concurrency(self, exports: int = 20, projects: int = 200):
+        """API latency while many PDF exports render simultaneously"""
+        print(f"\n📄 Export concurrency: {exports} simultaneous exports of {projects} projects")
+        self.seed_projects(projects)
+
+        # Baseline latency with no exports running
+        stop = threading.Event()
+        timer = threading.Timer(3, stop.set)
+        timer.start()
+        baseline = self.probe_latency(stop)
+
+        # Each export leaves out a different project, so every request misses
+        # the export cache and really renders
+        project_ids = self.list_project_ids(projects)
+        export_requests = [
+            {
+                "user_id": self.current_user['id'],
+                "export_type": "projects",
+                "project_ids": project_ids[:i] + project_ids[i + 1:]
+            }
+            for i in range(min(exports, len(project_ids)))
+        ]
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=exports + 1) as pool:
+            probe = pool.submit(self.probe_latency, stop)
+            export_futures = [
+                pool.submit(self.request, 'POST', 'export/pdf', export_request)
+                for export_request in export_requests
+            ]
+            export_results = [f.result() for f in export_futures]
+            stop.set()
+            under_load = probe.result()
+
+        failures = [r for r in export_results if r[0] != 200]
+        self.summarize("health (idle)", baseline)
+        self.summarize("health (during exports)", under_load)
+        self.summarize("export/pdf", [r[1] for r in export_results])
+        if failures:
+            print(f"  ❌ {len(failures)} exports failed: {failures[0][2]}")
+
+    def benchmark_pagination(self, page: int = 1000, page_size: int = 10, repeats: int = 20):
+        """Latency of a deep page with skip/limit versus keyset cursors"""
+        print(f"\n📑 Pagination: page {page} of {page_size} projects, skip vs keyset")
+        self.seed_projects(page * page_size)
+
+        # Walk the keyset cursors up to the target page (not timed)
+        after = None
+        for _ in range(page - 1):
+            response = self.session.get(
+                f"{self.base_url}/api/projects",
+                params={"limit": page_size, **({"after": after} if after else {})},
+                headers={'Authorization': f'Bearer {self.token}'}
+            )
+            after = response.headers.get('X-Next-Cursor')
+            if not after:
+                print("  ❌ Ran out of pages before reaching the target page")
+                return
+
+        skip_samples = [
+            self.request('GET', 'projects', params={"skip": (page - 1) * page_size, "limit": page_size})[1]
+            for _ in range(repeats)
+        ]
+        keyset_samples = [
+            self.request('GET', 'projects', params={"after": after, "limit": page_size})[1]
+            for _ in range(repeats)
+        ]
+        self.summarize("skip/limit", skip_samples)
+        self.summarize("keyset cursor", keyset_samples)
+
+    def benchmark_edit_latency(self, concurrency: int = 16, edits: int = 400):
+        """Latency of project and task edits issued concurrently"""
+        print(f"\n✏️  Edit path: {edits} project and {edits} task updates, {concurrency} concurrent clients")
+        _, _, project = self.request('POST', 'projects', {
+            "title": "Benchmark Edit Project", "description": "Project edited by the benchmark"
+        })
+        _, _, task = self.request('POST', f"projects/{project['id']}/tasks", {"title": "Benchmark Edit Task"})
+
+        def edit_project(i: int):
+            return self.request('PUT', f"projects/{project['id']}", {
+                "title": f"Benchmark Edit Project {i}",
+                "description": "Project edited by the benchmark",
+                "status": "completed" if i % 2 else "in-progress"
+            })
+
+        def edit_task(i: int):
+            return self.request('PUT', f"tasks/{task['id']}", {
+                "title": f"Benchmark Edit Task {i}",
+                "status": "completed" if i % 2 else "todo"
+            })
+
+        for name, edit in (("PUT projects/{id}", edit_project), ("PUT tasks/{id}", edit_task)):
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(edit, range(edits)))
+            failures = [r for r in results if r[0] != 200]
+            self.summarize(name, [r[1] for r in results])
+            if failures:
+                print(f"  ❌ {len(failures)} edits failed: {failures[0][2]}")
+
+        self.request('DELETE', f"projects/{project['id']}")
+
+    def benchmark_task_owner_filter(self, projects: int = 5000, tasks_per_project: int = 2, repeats: int = 20):
+        """User-wide task queries: project id $in list versus the denormalized user_id"""
+        print(f"\n👥 Task owner filter: {projects} projects x {tasks_per_project} tasks, $in vs user_id")
+        from pymongo import MongoClient
+
+        self.seed_projects(projects)
+        db = MongoClient(self.mongo_url).portfolio_db
+        user_id = self.current_user['id']
+        project_ids = [p["id"] for p in db.projects.find({"user_id": user_id}, {"id": 1})]
+        seeded = set(db.tasks.distinct("project_id", {"project_id": {"$in": project_ids}}))
+        for project_id in project_ids:
+            if project_id not in seeded:
+                self.request('POST', f"projects/{project_id}/tasks/bulk", [
+                    {"title": f"Benchmark Task {i}", "status": "completed" if i % 2 else "todo"}
+                    for i in range(tasks_per_project)
+                ])
+
+        totals = {
+            "_id": None,
+            "total": {"$sum": 1},
+            "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+        }
+
+        def by_project_ids():
+            ids = [p["id"] for p in db.projects.find({"user_id": user_id}, {"id": 1})]
+            list(db.tasks.aggregate([{"$match": {"project_id": {"$in": ids}}}, {"$group": totals}]))
+            return db.tasks.count_documents({"project_id": {"$in": ids}, "status": "completed"})
+
+        def by_owner():
+            list(db.tasks.aggregate([{"$match": {"user_id": user_id}}, {"$group": totals}]))
+            return db.tasks.count_documents({"user_id": user_id, "status": "completed"})
+
+        if by_project_ids() != by_owner():
+            print("  ❌ Owner filter disagrees with the project id lookup; run backfill-task-owners first")
+            return
+
+        for name, query in (("project_id $in", by_project_ids), ("user_id", by_owner)):
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - start) * 1000)
+            self.summarize(name, samples)
+
+    def benchmark_serialization(self, rows: int = 500, repeats: int = 50):
+        """In-process cost of serializing list responses: Pydantic validation versus the orjson fast path"""
+        print(f"\n🧬 Serialization: {rows}-row responses, validated vs trusted orjson")
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+        import server
+        from bson import ObjectId
+        from datetime import datetime
+        from fastapi.responses import JSONResponse, Response
+        from fastapi.routing import serialize_response
+
+        now = datetime.utcnow()
+        documents = {
+            "get_projects": (server.ProjectResponse, [{
+                "_id": ObjectId(), "id": f"project-{i}", "user_id": "benchmark-user",
+                "title": f"Benchmark Project {i}",
+                "description": "Seeded project used by the backend benchmarks. " * 4,
+                "technologies": ["Python", "FastAPI", "MongoDB"], "status": "in-progress",
+                "start_date": now, "end_date": None, "project_type": "software", "priority": "medium",
+                "tags": ["benchmark"], "files": [], "created_at": now, "updated_at": now
+            } for i in range(rows)]),
+            "get_project_tasks": (server.TaskResponse, [{
+                "_id": ObjectId(), "id": f"task-{i}", "project_id": "project-0",
+                "title": f"Benchmark Task {i}", "description": "Seeded task. " * 8,
+                "status": "todo", "priority": "medium", "due_date": now, "estimated_hours": 4.0,
+                "completed_at": None, "created_at": now, "updated_at": now
+            } for i in range(rows)])
+        }
+        routes = {route.name: route for route in server.app.routes if hasattr(route, "response_field")}
+        loop = asyncio.new_event_loop()
+
+        for name, (model, docs) in documents.items():
+            field = routes[name].response_field
+
+            def validated():
+                content = loop.run_until_complete(
+                    serialize_response(field=field, response_content=[model(**doc) for doc in docs])
+                )
+                return JSONResponse(content).body
+
+            def trusted():
+                return server.orjson_response(server.trusted_rows(docs, model), Response()).body
+
+            if json.loads(validated()) != json.loads(trusted()):
+                print(f"  ❌ {name}: fast path output differs from the validated response")
+                continue
+
+            samples = {}
+            for label, render in (("validated", validated), ("orjson", trusted)):
+                samples[label] = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    render()
+                    samples[label].append((time.perf_counter() - start) * 1000)
+                self.summarize(f"{name} {label}", samples[label])
+            speedup = statistics.median(samples["validated"]) / statistics.median(samples["orjson"])
+            print(f"  {name}: orjson path is {speedup:.1f}x faster")
+        loop.close()
+
+BENCHMARKS = {
+    "export-concurrency": PortfolioAPIBenchmark.benchmark_export_concurrency,
+    "pagination": PortfolioAPIBenchmark.benchmark_pagination,
+    "serialization": PortfolioAPIBenchmark.benchmark_serialization,
+    "edit-latency": PortfolioAPIBenchmark.benchmark_edit_latency,
+    "task-owner-filter": PortfolioAPIBenchmark.benchmark_task_owner_filter,
+}
+
+# Benchmarks that run in-process and need no live server
+OFFLINE_BENCHMARKS = {"serialization"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio API performance benchmarks")
+    parser.add_argument("benchmarks", nargs="*", help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--mongo-url", help="MongoDB used by the server, for benchmarks that query it directly (default: $MONGO_URL)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    selected = args.benchmarks or list(BENCHMARKS)
+    benchmark = PortfolioAPIBenchmark(args.base_url, args.mongo_url)
+    if set(selected) - OFFLINE_BENCHMARKS:
+        benchmark.authenticate()
+
+    for name in selected:
+        BENCHMARKS[name](benchmark)
+
+    print("\n" + "=" * 60)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())